@@ -5,16 +5,41 @@ Manages WebSocket connection from ACS and forwards audio to Voice Live API.
 import asyncio
 import json
 import logging
-from typing import Optional
+import time
+from typing import Coroutine, List, Optional, Union
 import websockets
 from websockets.exceptions import ConnectionClosed, WebSocketException
 
-from models import StreamingDataParser, AudioData, AudioMetadata
+from models import StreamingDataParser, AudioData, AudioFrame, AudioMetadata
 from azure_voice_live_service import AzureVoiceLiveService
-from audio_resampler import AudioResampler
+from dsp_pool import open_resampler_stream
+from config import settings
+from outbound_audio import OutboundAudioPacer
+from media_queue import BoundedMediaQueue
+from helpers import AudioHelper
+from capacity import capacity_manager
+from keepalive import keepalive_scheduler
+from latency import CallTimeline, get_turn_latency_summary
+from metrics import (
+    Gauge, ACS_WEBSOCKET_ERRORS, UPSTREAM_BYTES, UPSTREAM_DECODE_SECONDS,
+    UPSTREAM_PACKETS, UPSTREAM_RESAMPLE_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_CALLS = Gauge(
+    "voice_bridge_active_calls", "Calls with an active ACS media stream",
+    callback=lambda: len(capacity_manager.active_handlers)
+)
+UPSTREAM_QUEUE_DEPTH = Gauge(
+    "voice_bridge_queue_depth", "Packets queued across active calls", {"queue": "upstream"},
+    callback=lambda: sum(handler.upstream_queue.depth for handler in list(capacity_manager.active_handlers))
+)
+OUTBOUND_QUEUE_DEPTH = Gauge(
+    "voice_bridge_queue_depth", "Packets queued across active calls", {"queue": "outbound"},
+    callback=lambda: sum(handler.outbound_pacer.depth for handler in list(capacity_manager.active_handlers))
+)
+
 
 class ACSMediaStreamingHandler:
     """
@@ -22,20 +47,61 @@ class ACSMediaStreamingHandler:
     Processes incoming audio data and forwards to Azure Voice Live API.
     """
     
-    def __init__(self, websocket):
+    def __init__(self, websocket, voice_live_service: Optional[AzureVoiceLiveService] = None):
         """
         Initialize ACS media streaming handler.
         
         Args:
             websocket: WebSocket connection from ACS
+            voice_live_service: Pre-warmed Voice Live session for this call, if any
         """
         self.websocket = websocket
-        self.voice_live_service: Optional[AzureVoiceLiveService] = None
+        self.voice_live_service: Optional[AzureVoiceLiveService] = voice_live_service
         self.running = False
         self.audio_buffer = bytearray()
         self.cleanup_started = False
+        self._cleanup_done = asyncio.Event()
         self.last_heartbeat = asyncio.get_event_loop().time()
-        self.heartbeat_task = None
+        
+        # Last successful send to ACS; the keep-alive scheduler skips calls
+        # that are already sending media
+        self.last_sent_at = time.monotonic()
+        self._keepalive_count = 0
+        
+        # Background tasks owned by this call, cancelled together in _cleanup
+        self._tasks: List[asyncio.Task] = []
+        
+        # Monotonic latency marks for each conversational turn of this call
+        self.timeline = CallTimeline()
+        
+        # Per-call resampler keeps filter state across 20 ms ACS frames.
+        # Starts at the ACS default and is rebuilt if AudioMetadata differs.
+        self.acs_sample_rate = 16000
+        self.acs_channels = 1
+        self.upstream_resampler = open_resampler_stream(
+            self.acs_sample_rate, settings.voice_live_sample_rate, self.acs_channels
+        )
+        # Set from AudioMetadata: ACS already streams at the Voice Live rate, so
+        # audio is forwarded as base64 in both directions with no resampling
+        self.passthrough = False
+        
+        # Outbound AI audio is re-sliced into 20 ms frames and paced to ACS
+        self.outbound_pacer = OutboundAudioPacer(
+            self.send_message,
+            sample_rate=self.acs_sample_rate,
+            channels=self.acs_channels,
+            lead_ms=settings.outbound_audio_lead_ms,
+            max_buffer_ms=settings.outbound_audio_max_buffer_ms,
+            policy=settings.outbound_audio_queue_policy,
+            on_frame_sent=self.timeline.mark_outbound_frame,
+            on_control_sent=self.timeline.mark_stop_sent
+        )
+        
+        # Bounded queue between the ACS receive loop and the Voice Live send,
+        # so a slow Voice Live socket never stalls reading from ACS
+        self.upstream_queue = BoundedMediaQueue(
+            "upstream", settings.upstream_queue_max_packets, settings.upstream_queue_policy
+        )
         
         logger.info("ACS Media Streaming Handler initialized")
     
@@ -48,14 +114,22 @@ class ACSMediaStreamingHandler:
             logger.error("WebSocket connection is None")
             return
         
+        capacity_manager.register(self)
         try:
             logger.info("ACS WebSocket connected successfully. Initializing Voice Live connection...")
             
-            # Initialize Voice Live service
-            self.voice_live_service = AzureVoiceLiveService(self)
+            # Attach the pre-warmed Voice Live session, or create one for this call
+            if self.voice_live_service:
+                self.voice_live_service.attach(self)
+            else:
+                self.voice_live_service = AzureVoiceLiveService(self)
             
-            # Start heartbeat monitoring early to maintain connection
-            self.heartbeat_task = asyncio.create_task(self._heartbeat_monitor())
+            # Keep the connection alive from the shared scheduler, and start the
+            # writer tasks for each direction: the upstream forwarder sends to
+            # Voice Live and the pacer is the only media writer to ACS
+            keepalive_scheduler.register(self)
+            self._start_task(self._forward_upstream())
+            self.outbound_pacer.start()
             
             # Start processing ACS media stream immediately to receive metadata and establish flow
             receive_task = asyncio.create_task(self._start_receiving_from_acs())
@@ -92,8 +166,13 @@ class ACSMediaStreamingHandler:
     async def _initialize_voice_live(self) -> None:
         """Initialize Voice Live connection."""
         try:
-            # Connect to Voice Live API
-            if not await self.voice_live_service.connect():
+            # Use the pre-warmed handshake if there is one, else connect now
+            connected = False
+            if self.voice_live_service.connect_task:
+                connected = await self.voice_live_service.connect_task
+                if not connected:
+                    logger.warning("Pre-warmed Voice Live session failed to connect - retrying")
+            if not connected and not await self.voice_live_service.connect():
                 logger.error("Failed to connect to Voice Live API")
                 return
             
@@ -105,7 +184,7 @@ class ACSMediaStreamingHandler:
             try:
                 from models import StopAudioData
                 stop_message = StopAudioData.create()
-                await self.send_message(stop_message)
+                self.outbound_pacer.send_control(stop_message)
                 logger.info("Sent stop command to interrupt holding message")
             except Exception as stop_error:
                 logger.warning("Could not send stop command: %s", stop_error)
@@ -114,6 +193,21 @@ class ACSMediaStreamingHandler:
             logger.error("Error initializing Voice Live: %s", e)
             raise
     
+    def _start_task(self, coro: Coroutine) -> asyncio.Task:
+        """Start a background task that is cancelled when the call is cleaned up."""
+        task = asyncio.create_task(coro)
+        self._tasks.append(task)
+        return task
+    
+    async def _cancel_tasks(self) -> None:
+        """Cancel all background tasks and wait for them to finish."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning("Background task ended with error: %s", result)
+    
     async def send_message(self, message: str) -> None:
         """
         Send message back to ACS WebSocket.
@@ -126,16 +220,20 @@ class ACSMediaStreamingHandler:
         if self.websocket and not self.cleanup_started:
             try:
                 await self.websocket.send_text(message)
+                self.last_sent_at = time.monotonic()
             except ConnectionClosed as e:
+                ACS_WEBSOCKET_ERRORS.inc()
                 logger.warning("WebSocket connection closed during send: %s", e)
                 # Don't immediately stop - let the receive loop handle the disconnection
             except WebSocketException as e:
+                ACS_WEBSOCKET_ERRORS.inc()
                 logger.error("WebSocket error during send: %s", e)
                 # For WebSocket-specific errors, we might want to stop
                 if "1006" in str(e) or "1001" in str(e):
                     self.running = False
             except Exception as e:
                 if not self.cleanup_started:
+                    ACS_WEBSOCKET_ERRORS.inc()
                     logger.error("Error sending message to ACS: %s", e)
                     # Only stop for severe errors, not transient ones
                     if "broken pipe" in str(e).lower() or "connection reset" in str(e).lower():
@@ -182,14 +280,16 @@ class ACSMediaStreamingHandler:
                         logger.info("ACS WebSocket disconnected - cannot receive further messages")
                         break
                     else:
-                        logger.error(f"Runtime error in WebSocket receive: {e}")
+                        ACS_WEBSOCKET_ERRORS.inc()
+                        logger.error("Runtime error in WebSocket receive: %s", e)
                         break
                 except Exception as e:
-                    logger.error(f"Error receiving WebSocket message: {e}")
+                    ACS_WEBSOCKET_ERRORS.inc()
+                    logger.error("Error receiving WebSocket message: %s", e)
                     break
                     
         except Exception as e:
-            logger.error(f"Error receiving from ACS: {e}")
+            logger.error("Error receiving from ACS: %s", e)
             logger.exception("Full exception details:")
         finally:
             self.running = False
@@ -206,8 +306,8 @@ class ACSMediaStreamingHandler:
             # Extract the actual message content from FastAPI WebSocket message
             if isinstance(message, dict):
                 if "text" in message:
-                    # Text message - parse JSON
-                    message_content = json.loads(message["text"])
+                    # Text message - raw JSON, parsed below with the audio fast path
+                    message_content = message["text"]
                 elif "bytes" in message:
                     # Binary message - handle raw audio data
                     message_content = message["bytes"]
@@ -215,41 +315,53 @@ class ACSMediaStreamingHandler:
                     # WebSocket disconnect/close message - this is normal termination
                     message_type = message.get("type")
                     if message_type == "websocket.disconnect":
-                        logger.info(f"WebSocket disconnect message received: {message}")
+                        logger.info("WebSocket disconnect message received: %s", message)
                         # Set running to False to gracefully terminate the receive loop
                         self.running = False
                         return
                     else:
-                        logger.warning(f"Unknown WebSocket control message: {message}")
+                        logger.warning("Unknown WebSocket control message: %s", message)
                         return
                 else:
-                    logger.warning(f"Unknown WebSocket message format: {list(message.keys())}")
+                    logger.warning("Unknown WebSocket message format: %s", list(message.keys()))
                     return
             else:
                 message_content = message
             
             # Parse the streaming data
-            streaming_data = StreamingDataParser.parse(message_content)
+            if isinstance(message_content, str):
+                streaming_data = StreamingDataParser.parse_fast(message_content)
+            else:
+                streaming_data = StreamingDataParser.parse(message_content)
             
-            if isinstance(streaming_data, AudioData):
+            if isinstance(streaming_data, (AudioFrame, AudioData)):
                 await self._handle_audio_data(streaming_data)
             elif isinstance(streaming_data, AudioMetadata):
                 logger.info("Processing AudioMetadata - will send immediate audio response")
                 await self._handle_metadata(streaming_data)
                 
         except Exception as e:
-            logger.error(f"Error processing ACS message: {e}")
+            logger.error("Error processing ACS message: %s", e)
     
-    async def _handle_audio_data(self, audio_data: AudioData) -> None:
+    async def _handle_audio_data(self, audio_data: Union[AudioFrame, AudioData]) -> None:
         """
         Handle audio data from ACS and forward to Voice Live API.
         
         Args:
-            audio_data: Parsed audio data from ACS
+            audio_data: Parsed audio frame from ACS
         """
         try:
-            if not audio_data.is_silent:
+            UPSTREAM_PACKETS.inc()
+            if self.passthrough:
+                # Same rate both sides - forward the base64 payload undecoded
+                if not audio_data.is_silent and audio_data.data and self.voice_live_service:
+                    UPSTREAM_BYTES.inc(len(audio_data.data) // 4 * 3)
+                    await self.upstream_queue.put((audio_data.data, time.monotonic()), False)
+            elif not audio_data.is_silent:
+                decode_start = time.perf_counter()
                 audio_bytes = audio_data.to_bytes()
+                UPSTREAM_DECODE_SECONDS.observe(time.perf_counter() - decode_start)
+                UPSTREAM_BYTES.inc(len(audio_bytes))
                 if audio_bytes:
                     # Only log periodically to avoid spam
                     if hasattr(self, '_audio_count'):
@@ -258,13 +370,14 @@ class ACSMediaStreamingHandler:
                         self._audio_count = 1
                         
                     if self._audio_count % 100 == 0:  # Log every 100th audio packet
-                        logger.info(f"Processing audio packets: {self._audio_count} total, current: {len(audio_bytes)} bytes, timestamp: {audio_data.get_timestamp_ms()}")
+                        logger.info("Processing audio packets: %s total, current: %s bytes, timestamp: %s", self._audio_count, len(audio_bytes), audio_data.get_timestamp_ms())
                     
-                    # Forward audio to Voice Live API with proper resampling
+                    # Queue for the upstream sender with its arrival time; silence is
+                    # flagged so it can be shed first
                     if self.voice_live_service:
-                        # Resample from 16kHz (ACS) to 24kHz (Voice Live API)
-                        resampled_audio = AudioResampler.resample_16k_to_24k(audio_bytes)
-                        await self.voice_live_service.send_audio(resampled_audio)
+                        await self.upstream_queue.put(
+                            (audio_bytes, time.monotonic()), AudioHelper.is_silent_audio(audio_bytes)
+                        )
                 else:
                     # Only warn periodically about conversion issues
                     if not hasattr(self, '_conversion_warning_shown'):
@@ -273,7 +386,42 @@ class ACSMediaStreamingHandler:
             # Remove silent audio logging to reduce noise
                 
         except Exception as e:
-            logger.error(f"Error handling audio data: {e}")
+            logger.error("Error handling audio data: %s", e)
+    
+    async def _forward_upstream(self) -> None:
+        """Drain the upstream queue: resample and send audio to Voice Live API."""
+        try:
+            while True:
+                audio_bytes, arrived_at = await self.upstream_queue.get()
+                if not self.voice_live_service:
+                    continue
+                try:
+                    if isinstance(audio_bytes, str):
+                        # Passthrough - already base64 at the Voice Live rate
+                        await self.voice_live_service.send_audio_base64(audio_bytes, arrived_at)
+                        continue
+                    
+                    # Resample from the ACS rate to the Voice Live API rate
+                    resample_start = time.perf_counter()
+                    resampled_audio = await self.upstream_resampler.resample(audio_bytes)
+                    UPSTREAM_RESAMPLE_SECONDS.observe(time.perf_counter() - resample_start)
+                    await self.voice_live_service.send_audio(resampled_audio, arrived_at)
+                except Exception as e:
+                    logger.error("Error forwarding audio to Voice Live: %s", e)
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
+    
+    def get_queue_stats(self) -> dict:
+        """
+        Get per-call queue depth and drop counters for both directions.
+        
+        Returns:
+            Dictionary keyed by direction with current depth and counters
+        """
+        return {
+            "upstream": {"depth": self.upstream_queue.depth, **self.upstream_queue.stats.as_dict()},
+            "outbound": {"depth": self.outbound_pacer.depth, **self.outbound_pacer.stats.as_dict()}
+        }
     
     async def _handle_metadata(self, metadata: AudioMetadata) -> None:
         """
@@ -284,29 +432,60 @@ class ACSMediaStreamingHandler:
         """
         try:
             # Log basic metadata information
-            logger.info(f"AudioMetadata received - Sample Rate: {metadata.sample_rate}Hz, "
-                       f"Channels: {metadata.channels}, Encoding: {metadata.encoding}")
+            logger.info("AudioMetadata received - Sample Rate: %sHz, Channels: %s, Encoding: %s",
+                       metadata.sample_rate, metadata.channels, metadata.encoding)
+            
+            sample_rate = metadata.sample_rate or self.acs_sample_rate
+            channels = metadata.channels or self.acs_channels
+            if channels != 1:
+                # Voice Live audio is mono both ways; only mixed (mono) ACS streams are supported
+                logger.warning("Unsupported ACS channel count %d - keeping %d channel(s)", channels, self.acs_channels)
+                channels = self.acs_channels
+            if (sample_rate, channels) != (self.acs_sample_rate, self.acs_channels):
+                logger.info("Switching ACS audio format to %dHz/%d channel(s)", sample_rate, channels)
+                self.acs_sample_rate = sample_rate
+                self.acs_channels = channels
+                self.passthrough = sample_rate == settings.voice_live_sample_rate and channels == 1
+                if self.passthrough:
+                    logger.info("ACS and Voice Live rates match - forwarding audio without resampling")
+                self.upstream_resampler.close()
+                self.upstream_resampler = open_resampler_stream(
+                    sample_rate, settings.voice_live_sample_rate, channels
+                )
+                if self.voice_live_service:
+                    self.voice_live_service.set_output_format(sample_rate, channels)
+                # Frames already queued were cut and encoded for the old format
+                discarded = self.outbound_pacer.flush()
+                if discarded:
+                    logger.info("Discarded %d outbound frame(s) queued in the previous format", discarded)
+                self.outbound_pacer.set_format(sample_rate, channels)
                 
         except Exception as e:
-            logger.error(f"Error handling metadata: {e}")
+            logger.error("Error handling metadata: %s", e)
     
     
     async def _cleanup(self) -> None:
         """Cleanup resources and close connections."""
         if self.cleanup_started:
-            return  # Skip duplicate cleanup silently
+            # Cleanup was started elsewhere (e.g. a drain closing the call);
+            # wait for it so the WebSocket is closed before the endpoint returns
+            await self._cleanup_done.wait()
+            return
             
         self.cleanup_started = True
         self.running = False
+        capacity_manager.unregister(self)
+        keepalive_scheduler.unregister(self)
         
         try:
-            # Cancel heartbeat task
-            if self.heartbeat_task:
-                self.heartbeat_task.cancel()
-                try:
-                    await self.heartbeat_task
-                except asyncio.CancelledError:
-                    pass
+            # Stop the upstream writer and paced outbound audio
+            await self._cancel_tasks()
+            logger.info("Media queue stats: %s", self.get_queue_stats())
+            logger.info("Call completed %d timed turn(s); turn latency so far: %s",
+                        self.timeline.turns, get_turn_latency_summary())
+            self.upstream_queue.clear()
+            await self.outbound_pacer.close()
+            self.upstream_resampler.close()
             
             # Close Voice Live service
             if self.voice_live_service:
@@ -321,36 +500,25 @@ class ACSMediaStreamingHandler:
                     pass  # Ignore close errors during cleanup
                 
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
+            logger.error("Error during cleanup: %s", e)
+        finally:
+            self._cleanup_done.set()
         
         logger.info("ACS Media Streaming Handler cleanup completed")
     
-    async def _heartbeat_monitor(self) -> None:
-        """Monitor connection health and send periodic heartbeats."""
-        try:
-            heartbeat_count = 0
-            while self.running and not self.cleanup_started:
-                # Send periodic keep-alive messages every 5 seconds
-                try:
-                    heartbeat_count += 1
-                    keep_alive_message = {
-                        "kind": "connectivityCheck",
-                        "sequenceNumber": heartbeat_count,
-                        "timestamp": int(asyncio.get_event_loop().time() * 1000)
-                    }
-                    await self.websocket.send_text(json.dumps(keep_alive_message))
-                    self.last_heartbeat = asyncio.get_event_loop().time()
-                except Exception as e:
-                    logger.warning(f"Failed to send keep-alive: {e}")
-                    # Don't immediately fail - the receive loop will handle disconnections
-                
-                # Sleep for 5 seconds before next heartbeat
-                await asyncio.sleep(5)
-                
-        except asyncio.CancelledError:
-            pass  # Normal cancellation during shutdown
-        except Exception as e:
-            logger.error(f"Error in heartbeat monitor: {e}")
+    async def send_keepalive(self) -> None:
+        """Send a connectivity check to ACS (called by the keep-alive scheduler when the call is idle)."""
+        if not self.running or self.cleanup_started:
+            return
+        self._keepalive_count += 1
+        keep_alive_message = {
+            "kind": "connectivityCheck",
+            "sequenceNumber": self._keepalive_count,
+            "timestamp": int(asyncio.get_event_loop().time() * 1000)
+        }
+        # send_message counts and logs failures; the receive loop handles disconnections
+        await self.send_message(json.dumps(keep_alive_message))
+        self.last_heartbeat = asyncio.get_event_loop().time()
     
     def __del__(self):
         """Destructor to ensure cleanup on object deletion."""
@@ -1,12 +1,185 @@
 """
 Audio resampling utilities for converting between different sample rates.
 """
+from functools import lru_cache
+from math import gcd
+from typing import Union
+
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 from scipy import signal
 import logging
 
+from helpers import AudioHelper
+
 logger = logging.getLogger(__name__)
 
+# Taps per polyphase branch for the streaming resampler. 24 taps per phase
+# keeps the 16k <-> 24k filters well under 100 taps in total while still
+# giving a steep anti-aliasing/anti-imaging transition band for speech.
+TAPS_PER_PHASE = 24
+KAISER_BETA = 5.0
+
+
+@lru_cache(maxsize=None)
+def _design_polyphase_filter(up: int, down: int) -> np.ndarray:
+    """
+    Design the polyphase filter matrix for an up/down rate pair.
+    
+    Filter design runs once per rate pair per process; every stream with the
+    same pair shares the resulting read-only matrix.
+    
+    Args:
+        up: Interpolation factor (reduced output rate)
+        down: Decimation factor (reduced input rate)
+        
+    Returns:
+        float32 matrix of shape (span, up) applied to each input window
+    """
+    # Low-pass prototype at the narrower of the two Nyquist bands, scaled
+    # by the interpolation factor to keep unity gain after zero-stuffing
+    prototype = signal.firwin(
+        up * TAPS_PER_PHASE,
+        1.0 / max(up, down),
+        window=("kaiser", KAISER_BETA)
+    ) * up
+    
+    # Polyphase branches, reversed so each output sample is a dot product
+    # against a forward-ordered window of input history
+    phases = prototype.reshape(TAPS_PER_PHASE, up).T[:, ::-1]
+    
+    # One period of the output pattern is `up` samples and consumes `down`
+    # input samples. Lay the branch used by each output of the period into
+    # a single (span, up) matrix so a whole chunk is one strided matmul.
+    shifts = [(k * down) // up for k in range(up)]
+    filter_matrix = np.zeros((TAPS_PER_PHASE + shifts[-1], up), dtype=np.float32)
+    for k, shift in enumerate(shifts):
+        filter_matrix[shift:shift + TAPS_PER_PHASE, k] = phases[(k * down) % up]
+    
+    logger.info("Designed %d:%d polyphase resampling filter (%d taps)", up, down, up * TAPS_PER_PHASE)
+    filter_matrix.setflags(write=False)
+    return filter_matrix
+
+
+class StreamingResampler:
+    """
+    Stateful polyphase resampler for continuous PCM streams.
+    
+    Unlike the one-shot FFT resampling in ``AudioResampler``, this keeps the
+    FIR filter history between packets so consecutive 20 ms frames join
+    without edge discontinuities (audible as clicks), and the per-packet cost
+    is a handful of small dot products instead of a full FFT.
+    
+    Create instances through ``get_resampler``, one per call and per direction;
+    instances are not safe to share between streams because they carry filter
+    state, but the filter coefficients themselves are shared process-wide.
+    """
+    
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1):
+        """
+        Initialize streaming resampler.
+        
+        Args:
+            in_rate: Input sample rate in Hz (e.g. 16000 for ACS)
+            out_rate: Output sample rate in Hz (e.g. 24000 for Voice Live)
+            channels: Number of interleaved channels in the PCM stream
+        """
+        if in_rate <= 0 or out_rate <= 0:
+            raise ValueError(f"Sample rates must be positive: {in_rate} -> {out_rate}")
+        if channels <= 0:
+            raise ValueError(f"Channel count must be positive: {channels}")
+        
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.passthrough = self.up == self.down
+        
+        if not self.passthrough:
+            self._filter = _design_polyphase_filter(self.up, self.down)
+            self._span = self._filter.shape[0]
+        self.reset()
+    
+    def reset(self) -> None:
+        """Discard filter history, e.g. when a stream restarts after barge-in."""
+        self._history = np.zeros((TAPS_PER_PHASE - 1, self.channels), dtype=np.float32)
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Resample a chunk of float32 samples, carrying state to the next call.
+        
+        Output is produced in whole filter periods; up to ``down - 1`` trailing
+        input frames are held back and emitted with the next chunk.
+        
+        Args:
+            samples: float32 array at the input rate, either 1-D mono or
+                shaped (frames, channels)
+            
+        Returns:
+            float32 array at the output rate, with the same layout as the input
+        """
+        if self.passthrough:
+            return samples.astype(np.float32, copy=False)
+        
+        frames = samples.reshape(-1, self.channels)
+        buffer = np.concatenate((self._history, frames.astype(np.float32, copy=False)))
+        periods = (len(buffer) - self._span) // self.down + 1
+        if periods <= 0:
+            self._history = buffer
+            return np.empty((0,) if samples.ndim == 1 else (0, self.channels), dtype=np.float32)
+        
+        # (periods, channels, span) view over the history without copying
+        frame_stride, sample_stride = buffer.strides
+        windows = as_strided(
+            buffer,
+            shape=(periods, self.channels, self._span),
+            strides=(self.down * frame_stride, sample_stride, frame_stride),
+            writeable=False
+        )
+        output = (windows @ self._filter).transpose(0, 2, 1).reshape(-1, self.channels)
+        self._history = buffer[periods * self.down:].copy()
+        return output.ravel() if samples.ndim == 1 else output
+    
+    def resample(self, audio: Union[bytes, bytearray, memoryview]) -> bytes:
+        """
+        Resample interleaved 16-bit PCM bytes, carrying state to the next call.
+        
+        Args:
+            audio: PCM audio data at the input rate, 16-bit, interleaved
+            
+        Returns:
+            PCM audio data at the output rate, 16-bit, interleaved
+        """
+        if self.passthrough or len(audio) == 0:
+            return bytes(audio)
+        
+        samples = np.frombuffer(audio, dtype=np.int16)
+        output = self.process(samples.astype(np.float32)).ravel()
+        np.rint(output, out=output)
+        np.clip(output, -32768, 32767, out=output)
+        return output.astype(np.int16).tobytes()
+
+
+def get_resampler(in_rate: int, out_rate: int, channels: int = 1) -> StreamingResampler:
+    """
+    Get a per-stream resampler for any rate pair.
+    
+    The anti-aliasing filter for each reduced rate pair is designed once and
+    cached for the lifetime of the process, so this is cheap enough to call
+    for every new call or whenever ACS reports a different sample rate.
+    
+    Args:
+        in_rate: Input sample rate in Hz
+        out_rate: Output sample rate in Hz
+        channels: Number of interleaved channels
+        
+    Returns:
+        New StreamingResampler with its own filter history
+    """
+    return StreamingResampler(in_rate, out_rate, channels)
+
 
 class AudioResampler:
     """Audio resampling utilities for Voice Live API integration."""
@@ -90,28 +263,14 @@ class AudioResampler:
         """
         Check if audio data is silent (below threshold).
         
+        Kept for compatibility; delegates to ``AudioHelper.is_silent_audio``
+        so the bridge has a single silence detector.
+        
         Args:
             audio_bytes: PCM audio data
-            threshold: RMS threshold for silence detection (0.0 - 1.0)
+            threshold: Peak threshold for silence detection (0.0 - 1.0)
             
         Returns:
             True if audio is considered silent
         """
-        try:
-            if len(audio_bytes) == 0:
-                return True
-                
-            # Convert to numpy array
-            audio_array = np.frombuffer(audio_bytes, dtype=np.int16)
-            
-            # Calculate RMS (Root Mean Square)
-            rms = np.sqrt(np.mean(audio_array.astype(np.float32) ** 2))
-            
-            # Normalize RMS to 0-1 range (32767 is max value for int16)
-            normalized_rms = rms / 32767.0
-            
-            return normalized_rms < threshold
-            
-        except Exception as e:
-            logger.error(f"Error checking audio silence: {e}")
-            return False
+        return AudioHelper.is_silent_audio(audio_bytes, threshold)
@@ -1,31 +1,61 @@
 """
 Azure OpenAI Voice Live API service implementation.
-Handles We            logger.info("Voice Live WebSocket connected")
-            
-            # Start message receiving task
-            asyncio.create_task(self._receive_messages())
-            
-            # Agent mode: Send session update but skip system prompt - instructions are pre-configured in the agent
-            await self._update_session()
-            await asyncio.sleep(0.2)
-            self.running = True
-                
-            return Trueto Azure OpenAI Voice Live API for real-time audio processing.
+Handles WebSocket connections to Azure OpenAI Voice Live API for real-time audio processing.
 """
 import asyncio
+import base64
 import websockets
 import json
 import logging
-from typing import Optional, Callable, Any
+import time
+from collections import deque
+from typing import Optional, Callable, Awaitable, Any, Deque, Dict, List, Set
 import uuid
 from datetime import datetime
 
 from config import settings
-from models import SessionUpdate, ResponseCreate, InputAudioBuffer
+from models import (
+    SessionUpdate, ResponseCreate, ResponseCancel, InputAudioBuffer, OutboundAudioEncoder, VoiceLiveEventParser
+)
 from helpers import AudioHelper
+from dsp_pool import open_resampler_stream
+from media_queue import BackpressurePolicy, BoundedMediaQueue
+from latency import CallTimeline
+from metrics import (
+    Counter, DOWNSTREAM_DECODE_SECONDS, DOWNSTREAM_RESAMPLE_SECONDS, UPSTREAM_ENCODE_SECONDS,
+    VOICE_LIVE_CONNECT_SECONDS, VOICE_LIVE_WEBSOCKET_ERRORS
+)
 
 logger = logging.getLogger(__name__)
 
+# Audio appends waiting for the Voice Live writer task. When the socket falls
+# behind, senders block here and the handler's upstream queue policy decides
+# which ACS audio to shed. Control messages bypass this queue.
+VOICE_LIVE_SEND_QUEUE_SIZE = 32
+
+# Response audio deltas waiting to be resampled (or, in passthrough, sliced) for ACS
+DOWNSTREAM_QUEUE_SIZE = 500
+
+CANCELLED_RESPONSES = Counter(
+    "voice_bridge_responses_cancelled", "Voice Live responses cancelled because the caller barged in"
+)
+LATE_DELTAS_DROPPED = Counter(
+    "voice_bridge_late_deltas_dropped", "Audio deltas of cancelled responses discarded on arrival"
+)
+
+# Events that need no handling and are not worth logging
+INFORMATIONAL_EVENT_TYPES = frozenset({
+    "response.audio_transcript.done",
+    "response.content_part.done",
+    "response.output_item.done",
+    "response.output_item.added",
+    "response.content_part.added",
+    "response.audio_transcript.delta",
+    "conversation.item.created",
+    "conversation.item.input_audio_transcription.completed",
+    "input_audio_buffer.committed"
+})
+
 
 class AzureVoiceLiveService:
     """
@@ -33,21 +63,114 @@ class AzureVoiceLiveService:
     Manages WebSocket connection and real-time audio processing.
     """
     
-    def __init__(self, media_handler: Any):
+    def __init__(self, media_handler: Any = None):
         """
         Initialize Voice Live service.
         
         Args:
-            media_handler: Reference to ACS media streaming handler
+            media_handler: Reference to ACS media streaming handler, or None
+                for a pre-warmed session that is attached to a call later
         """
         self.media_handler = media_handler
         self.websocket: Optional[websockets.WebSocketServerProtocol] = None
         self.connection_ready = asyncio.Event()
+        self.connect_task: Optional[asyncio.Task] = None
+        
+        # Response audio is held in the downstream queue until a call is attached
+        self._attached = asyncio.Event()
+        if media_handler is not None:
+            self._attached.set()
         self.running = False
         self.client_request_id = str(uuid.uuid4())
         
+        # Share the handler's latency timeline so both sides mark the same turns
+        self.timeline = getattr(media_handler, 'timeline', None) or CallTimeline()
+        
         # Audio processing configuration
         self.audio_format = AudioHelper.get_audio_format_info(16000, 1, 16)
+        self.downstream_resampler = open_resampler_stream(settings.voice_live_sample_rate, 16000)
+        self.outbound_encoder = OutboundAudioEncoder("VoiceLiveAI")
+        
+        # True when ACS streams at the Voice Live rate: response audio is then
+        # passed to the pacer as base64, never decoded or resampled
+        self.passthrough = False
+        
+        # Upstream coalescing of resampled ACS frames into larger appends
+        self._append_window_bytes = (
+            settings.voice_live_sample_rate * 2 * settings.voice_live_append_window_ms // 1000
+        )
+        self._append_buffer = bytearray()
+        self._append_base64: List[str] = []  # Passthrough frames, still base64
+        self._append_base64_chars = 0
+        self._append_arrived_at: Optional[float] = None
+        self._append_timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        
+        # Reader/writer tasks: the reader never waits on the ACS side and the
+        # writer is the only coroutine that sends on the Voice Live socket.
+        # Control messages (session.update, response.create/cancel) have an
+        # unbounded queue of their own that the writer empties first, so
+        # queueing one never blocks and never waits behind audio
+        self._send_queue = BoundedMediaQueue(
+            "voice-live-send", VOICE_LIVE_SEND_QUEUE_SIZE, BackpressurePolicy.BLOCK
+        )
+        self._control: Deque[str] = deque()
+        self._writer_wakeup: Optional[asyncio.Future] = None
+        self._downstream_queue = BoundedMediaQueue(
+            "downstream", DOWNSTREAM_QUEUE_SIZE, BackpressurePolicy.DROP_OLDEST
+        )
+        self._barge_in_epoch = 0
+        self._tasks: List[asyncio.Task] = []
+        
+        # Response being generated, and cancelled responses whose deltas may still arrive
+        self._active_response_id: Optional[str] = None
+        self._cancelled_response_ids: Set[str] = set()
+        
+        # Voice Live event type -> handler taking the raw message
+        self._event_handlers: Dict[str, Callable[[str], Awaitable[None]]] = {
+            "session.created": self._on_session_created,
+            "session.updated": self._on_session_updated,
+            "response.audio.delta": self._on_audio_delta,
+            "input_audio_buffer.speech_started": self._on_speech_started,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "response.audio.done": self._on_audio_done,
+            "response.created": self._on_response_created,
+            "response.done": self._on_response_done,
+            "error": self._on_error
+        }
+    
+    def attach(self, media_handler: Any) -> None:
+        """
+        Attach a pre-warmed session to the ACS media handler of its call.
+        
+        Response audio that arrived before the media stream (e.g. the agent
+        greeting) is released to the handler's pacer from this point on.
+        
+        Args:
+            media_handler: ACS media streaming handler for the call
+        """
+        self.media_handler = media_handler
+        self.timeline = media_handler.timeline
+        self._attached.set()
+    
+    def set_output_format(self, sample_rate: int, channels: int = 1) -> None:
+        """
+        Switch the audio format sent back to ACS.
+        
+        Voice Live response audio is mono, so only the sample rate is
+        converted; a multi-channel format is rejected and the current one kept.
+        
+        Args:
+            sample_rate: ACS media streaming sample rate in Hz
+            channels: ACS media streaming channel count
+        """
+        if channels != 1:
+            logger.warning("Unsupported ACS channel count %d - keeping the current output format", channels)
+            return
+        self.audio_format = AudioHelper.get_audio_format_info(sample_rate, channels, 16)
+        self.passthrough = sample_rate == settings.voice_live_sample_rate
+        self.downstream_resampler.close()
+        self.downstream_resampler = open_resampler_stream(settings.voice_live_sample_rate, sample_rate)
     
     async def connect(self) -> bool:
         """
@@ -59,22 +182,26 @@ class AzureVoiceLiveService:
         """
         try:
             # Ensure any existing connection is closed first
+            reconnecting = self.websocket is not None
             if self.websocket and not self.websocket.closed:
                 await self.websocket.close()
                 
             # Reset connection state for new call
+            await self._stop_tasks()
             self.connection_ready.clear()
             self.running = False
             self.client_request_id = str(uuid.uuid4())  # Generate new request ID for each call
             
             # Small delay to prevent rapid reconnection issues
-            await asyncio.sleep(0.1)
+            if reconnecting:
+                await asyncio.sleep(0.1)
                 
             # Try connecting with current tokens
             return await self._connect_with_retry()
             
         except Exception as e:
-            logger.error(f"Failed to connect to Voice Live API: {e}")
+            VOICE_LIVE_WEBSOCKET_ERRORS.inc()
+            logger.error("Failed to connect to Voice Live API: %s", e)
             logger.exception("Full connection error details:")
             return False
     
@@ -86,11 +213,12 @@ class AzureVoiceLiveService:
         This is essential for production environments where tokens may expire.
         """
         try:
-            voice_live_url = settings.get_voice_live_websocket_url()
-            headers = settings.get_websocket_headers(self.client_request_id)
+            voice_live_url = await settings.get_voice_live_websocket_url_async()
+            headers = await settings.get_websocket_headers_async(self.client_request_id)
             
-            logger.info(f"Connecting to Voice Live API using Azure Managed Identity... (Request ID: {self.client_request_id})")
+            logger.info("Connecting to Voice Live API using Azure Managed Identity... (Request ID: %s)", self.client_request_id)
             
+            connect_start = time.perf_counter()
             self.websocket = await asyncio.wait_for(
                 websockets.connect(
                     voice_live_url,
@@ -102,10 +230,11 @@ class AzureVoiceLiveService:
                 timeout=15  # 15 second connection timeout
             )
             
-            logger.info(f"Voice Live WebSocket connected successfully (Request ID: {self.client_request_id})")
+            VOICE_LIVE_CONNECT_SECONDS.observe(time.perf_counter() - connect_start)
+            logger.info("Voice Live WebSocket connected successfully (Request ID: %s)", self.client_request_id)
             
-            # Start message receiving task
-            asyncio.create_task(self._receive_messages())
+            # Start reader, writer and downstream tasks
+            self._start_tasks()
             
             # Agent mode: Send session update but skip system prompt - instructions are pre-configured in the agent
             await self._update_session()
@@ -117,12 +246,13 @@ class AzureVoiceLiveService:
         except websockets.InvalidStatusCode as e:
             if e.status_code == 401:
                 # Authentication failed - refresh tokens and retry once
-                logger.warning(f"Voice Live authentication failed (401), refreshing tokens and retrying... (Request ID: {self.client_request_id})")
+                logger.warning("Voice Live authentication failed (401), refreshing tokens and retrying... (Request ID: %s)", self.client_request_id)
                 
-                settings.force_refresh_tokens()
-                voice_live_url = settings.get_voice_live_websocket_url()
-                headers = settings.get_websocket_headers(self.client_request_id)
+                await settings.force_refresh_tokens_async()
+                voice_live_url = await settings.get_voice_live_websocket_url_async()
+                headers = await settings.get_websocket_headers_async(self.client_request_id)
                 
+                connect_start = time.perf_counter()
                 self.websocket = await asyncio.wait_for(
                     websockets.connect(
                         voice_live_url,
@@ -134,10 +264,11 @@ class AzureVoiceLiveService:
                     timeout=15  # 15 second connection timeout
                 )
                 
-                logger.info(f"Voice Live WebSocket connected after token refresh (Request ID: {self.client_request_id})")
+                VOICE_LIVE_CONNECT_SECONDS.observe(time.perf_counter() - connect_start)
+                logger.info("Voice Live WebSocket connected after token refresh (Request ID: %s)", self.client_request_id)
                 
                 # Start message handling and session setup
-                asyncio.create_task(self._receive_messages())
+                self._start_tasks()
                 await self._update_session()
                 await asyncio.sleep(0.2)
                 self.running = True
@@ -145,56 +276,173 @@ class AzureVoiceLiveService:
                 return True
             else:
                 # Other HTTP errors, don't retry
-                logger.error(f"Voice Live connection failed with status {e.status_code}: {e}")
+                logger.error("Voice Live connection failed with status %s: %s", e.status_code, e)
                 raise
         except asyncio.TimeoutError:
-            logger.error(f"Voice Live connection timed out after 15 seconds (Request ID: {self.client_request_id})")
+            logger.error("Voice Live connection timed out after 15 seconds (Request ID: %s)", self.client_request_id)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error during Voice Live connection: {e}")
+            logger.error("Unexpected error during Voice Live connection: %s", e)
             logger.exception("Full Voice Live connection error:")
             raise
     
+    def _start_tasks(self) -> None:
+        """Start the reader, writer and downstream tasks for a new connection."""
+        self._tasks = [
+            asyncio.create_task(self._receive_messages()),
+            asyncio.create_task(self._write_messages()),
+            asyncio.create_task(self._forward_downstream())
+        ]
+    
+    async def _stop_tasks(self) -> None:
+        """Cancel connection tasks and wait for them to finish."""
+        tasks = self._tasks + list(self._flush_tasks)
+        self._tasks = []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._send_queue.clear()
+        self._control.clear()
+        self._downstream_queue.clear()
+    
     async def wait_for_connection(self) -> None:
         """Wait for Voice Live connection to be established."""
         await self.connection_ready.wait()
     
-    async def send_audio(self, audio_bytes: bytes) -> None:
+    async def send_audio(self, audio_bytes: bytes, arrived_at: Optional[float] = None) -> None:
         """
         Send audio data to Voice Live API.
         
+        Every frame is forwarded, quiet ones included: server VAD needs the
+        trailing silence to detect the end of speech. Audio is coalesced into
+        larger input_audio_buffer.append messages: the buffer is sent once it
+        holds a full coalescing window, or when the max-latency timer armed
+        by its first packet fires.
+        
         Args:
             audio_bytes: PCM audio data
+            arrived_at: Monotonic time the source ACS frame arrived, for latency tracking
         """
         if not self.websocket or not self.running:
             return
         
         try:
-            if not AudioHelper.is_silent_audio(audio_bytes):
+            if self._append_window_bytes <= 0:
+                encode_start = time.perf_counter()
                 message = InputAudioBuffer.create(audio_bytes)
-                await self.websocket.send(message)
+                UPSTREAM_ENCODE_SECONDS.observe(time.perf_counter() - encode_start)
+                await self._send_queue.put(message)
+                self.timeline.mark_append(arrived_at)
+                return
+            
+            if not self._append_buffer:
+                self._append_arrived_at = arrived_at
+            self._append_buffer += audio_bytes
+            if len(self._append_buffer) >= self._append_window_bytes:
+                await self._flush_audio()
+            elif self._append_timer is None:
+                self._append_timer = asyncio.get_running_loop().call_later(
+                    settings.voice_live_append_window_ms / 1000.0, self._on_append_timer
+                )
                 
         except Exception as e:
-            logger.error(f"Error sending audio to Voice Live: {e}")
+            logger.error("Error sending audio to Voice Live: %s", e)
+    
+    async def send_audio_base64(self, audio_b64: str, arrived_at: Optional[float] = None) -> None:
+        """
+        Send base64 audio already at the Voice Live rate (passthrough mode).
+        
+        ACS frames are appended without being decoded: unpadded base64 chunks
+        concatenate into valid base64, so they are coalesced as text on the
+        same window and timer as ``send_audio``. A padded chunk can only end
+        an append, so it flushes the window.
+        
+        Args:
+            audio_b64: Base64 PCM audio from an ACS AudioData frame
+            arrived_at: Monotonic time the source ACS frame arrived, for latency tracking
+        """
+        if not self.websocket or not self.running:
+            return
+        
+        try:
+            if not self._append_buffer and not self._append_base64:
+                self._append_arrived_at = arrived_at
+            self._append_base64.append(audio_b64)
+            self._append_base64_chars += len(audio_b64)
+            if (audio_b64.endswith("=")
+                    or self._append_base64_chars * 3 // 4 >= self._append_window_bytes):
+                await self._flush_audio()
+            elif self._append_timer is None:
+                self._append_timer = asyncio.get_running_loop().call_later(
+                    settings.voice_live_append_window_ms / 1000.0, self._on_append_timer
+                )
+                
+        except Exception as e:
+            logger.error("Error sending audio to Voice Live: %s", e)
+    
+    def _on_append_timer(self) -> None:
+        """Max-latency timer for coalesced audio - flush whatever is buffered."""
+        self._append_timer = None
+        if self._append_buffer or self._append_base64:
+            task = asyncio.create_task(self._flush_audio())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+    
+    async def _flush_audio(self) -> None:
+        """Send buffered upstream audio as a single input_audio_buffer.append."""
+        if self._append_timer is not None:
+            self._append_timer.cancel()
+            self._append_timer = None
+        if not self._append_buffer and not self._append_base64:
+            return
+        
+        # Swap the buffers before awaiting so new audio starts the next window
+        # (both hold audio only right after a format switch)
+        messages = []
+        encode_start = time.perf_counter()
+        if self._append_buffer:
+            messages.append(InputAudioBuffer.create(bytes(self._append_buffer)))
+            self._append_buffer.clear()
+        if self._append_base64:
+            messages.append(InputAudioBuffer.create_base64("".join(self._append_base64)))
+            self._append_base64.clear()
+            self._append_base64_chars = 0
+        UPSTREAM_ENCODE_SECONDS.observe(time.perf_counter() - encode_start)
+        arrived_at = self._append_arrived_at
+        
+        if not self.websocket or not self.running:
+            return
+        for message in messages:
+            await self._send_queue.put(message)
+        self.timeline.mark_append(arrived_at)
     
     async def close(self) -> None:
         """Close Voice Live WebSocket connection."""
+        if self._append_timer is not None:
+            self._append_timer.cancel()
+            self._append_timer = None
+        self._append_buffer.clear()
+        self._append_base64.clear()
+        self._append_base64_chars = 0
         self.running = False
+        await self._stop_tasks()
+        self.downstream_resampler.close()
         if self.websocket:
             try:
                 await self.websocket.close()
                 logger.info("Voice Live connection closed")
             except Exception as e:
-                logger.error(f"Error closing Voice Live connection: {e}")
+                logger.error("Error closing Voice Live connection: %s", e)
     
     async def _update_session(self) -> None:
         """Update Voice Live session configuration for agent mode."""
         try:
-            session_update = SessionUpdate.create_default()
-            await self.websocket.send(session_update)
-            logger.info(f"Session update sent (Request ID: {self.client_request_id})")
+            session_update = SessionUpdate.create_default(settings.voice_live_sample_rate)
+            self._queue_control(session_update)
+            logger.info("Session update sent (Request ID: %s)", self.client_request_id)
         except Exception as e:
-            logger.error(f"Error updating session (Request ID: {self.client_request_id}): {e}")
+            logger.error("Error updating session (Request ID: %s): %s", self.client_request_id, e)
     
     async def _create_conversation(self) -> None:
         """Not needed in agent mode - instructions are pre-configured."""
@@ -208,11 +456,9 @@ class AzureVoiceLiveService:
                 return
                 
             response_message = ResponseCreate.create()
-            await self.websocket.send(response_message)
-        except websockets.exceptions.ConnectionClosed as e:
-            logger.warning(f"WebSocket connection closed while starting response: {e}")
+            self._queue_control(response_message)
         except Exception as e:
-            logger.error(f"Error starting response: {e}")
+            logger.error("Error starting response: %s", e)
     
     async def _receive_messages(self) -> None:
         """
@@ -225,148 +471,251 @@ class AzureVoiceLiveService:
         except websockets.exceptions.ConnectionClosed:
             logger.info("Voice Live connection closed")
         except Exception as e:
-            logger.error(f"Error receiving Voice Live messages: {e}")
+            VOICE_LIVE_WEBSOCKET_ERRORS.inc()
+            logger.error("Error receiving Voice Live messages: %s", e)
         finally:
             self.running = False
     
+    async def _write_messages(self) -> None:
+        """
+        Send queued messages to Voice Live API.
+        
+        Runs independently of the reader so a slow send never delays
+        response audio on its way back to the caller. Queued control
+        messages are sent before the next audio append.
+        """
+        try:
+            while True:
+                if self._control:
+                    await self.websocket.send(self._control.popleft())
+                elif self._send_queue:
+                    await self.websocket.send(self._send_queue.get_nowait())
+                else:
+                    await self._wait_for_messages()
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
+        except websockets.exceptions.ConnectionClosed as e:
+            VOICE_LIVE_WEBSOCKET_ERRORS.inc()
+            logger.warning("Voice Live connection closed while sending: %s", e)
+        except Exception as e:
+            VOICE_LIVE_WEBSOCKET_ERRORS.inc()
+            logger.error("Error sending message to Voice Live: %s", e)
+        finally:
+            self.running = False
+    
+    async def _wait_for_messages(self) -> None:
+        """Wait until an audio append or a control message is queued."""
+        self._writer_wakeup = asyncio.get_running_loop().create_future()
+        appends = asyncio.ensure_future(self._send_queue.wait_not_empty())
+        try:
+            await asyncio.wait((self._writer_wakeup, appends), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            appends.cancel()
+            self._writer_wakeup = None
+    
+    def _queue_control(self, message: str) -> None:
+        """Queue a control message for the writer without waiting."""
+        self._control.append(message)
+        if self._writer_wakeup is not None and not self._writer_wakeup.done():
+            self._writer_wakeup.set_result(None)
+    
+    async def _forward_downstream(self) -> None:
+        """
+        Resample queued response audio and hand it to the outbound pacer.
+        
+        Audio resampled across a barge-in is discarded by comparing the
+        barge-in epoch before and after the resample. Passthrough audio is
+        queued as base64 text and goes to the pacer untouched.
+        """
+        try:
+            await self._attached.wait()
+            while True:
+                audio_bytes = await self._downstream_queue.get()
+                pacer = getattr(self.media_handler, 'outbound_pacer', None) if self.media_handler else None
+                if pacer is None:
+                    logger.warning("Media handler outbound pacer not available - skipping audio send")
+                    continue
+                try:
+                    if audio_bytes is None:
+                        # End of response audio - release the trailing partial frame
+                        await pacer.finish()
+                        continue
+                    if isinstance(audio_bytes, str):
+                        await pacer.enqueue_base64(audio_bytes)
+                        continue
+                    
+                    epoch = self._barge_in_epoch
+                    # Resample from the Voice Live rate to the ACS rate
+                    resample_start = time.perf_counter()
+                    resampled_audio = await self.downstream_resampler.resample(audio_bytes)
+                    DOWNSTREAM_RESAMPLE_SECONDS.observe(time.perf_counter() - resample_start)
+                    if epoch != self._barge_in_epoch:
+                        continue  # Caller barged in while resampling
+                    
+                    # Queue for paced delivery - the pacer re-slices into 20 ms frames
+                    if len(resampled_audio) > 0:
+                        await pacer.enqueue(resampled_audio)
+                except Exception as e:
+                    logger.error("Error forwarding audio to ACS: %s", e)
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
+    
     async def _process_voice_live_message(self, message: str) -> None:
         """
-        Process incoming message from Voice Live API.
+        Dispatch an incoming Voice Live event to its handler.
+        
+        The event type is sniffed from the raw text, so audio deltas are
+        never fully parsed; handlers receive the raw message and extract
+        only what they need.
         
         Args:
             message: JSON message from Voice Live API
         """
         try:
-            data = json.loads(message)
-            message_type = data.get("type", "")
-            
-            if message_type == "session.created":
-                # In agent mode, session.created is enough to proceed
-                logger.info(f"Session created - starting AI response (Request ID: {self.client_request_id})")
-                await self._start_response()
-                
-            elif message_type == "session.updated":
-                # Set connection ready for agent mode
-                logger.info(f"Session updated - connection ready (Request ID: {self.client_request_id})")
-                self.connection_ready.set()
-                
-            elif message_type == "response.audio.delta":
-                # Forward audio response to ACS
-                logger.info("🎵 Received audio delta from AI - forwarding to caller")
-                await self._handle_audio_delta(data)
-                
-            elif message_type == "input_audio_buffer.speech_started":
-                # Handle barge-in (voice activity detection)
-                logger.info("Voice activity detected - triggering barge-in")
-                await self._handle_speech_started()
-                
-            elif message_type == "response.created":
-                logger.info("AI response created")
-                
-            elif message_type == "response.done":
-                logger.info("AI response completed")
-                
-            elif message_type == "error":
-                error_info = data.get("error", {})
-                logger.error(f"Voice Live API error: {error_info}")
-                
-            else:
+            message_type = VoiceLiveEventParser.sniff_type(message)
+            handler = self._event_handlers.get(message_type)
+            if handler is not None:
+                await handler(message)
+            elif message_type not in INFORMATIONAL_EVENT_TYPES:
                 # Log unhandled message types for troubleshooting
-                expected_informational = [
-                    "response.audio.done", 
-                    "response.audio_transcript.done",
-                    "response.content_part.done",
-                    "response.output_item.done",
-                    "response.output_item.added",
-                    "response.content_part.added",
-                    "response.audio_transcript.delta",
-                    "conversation.item.created",
-                    "conversation.item.input_audio_transcription.completed",
-                    "input_audio_buffer.speech_stopped",
-                    "input_audio_buffer.committed"
-                ]
-                
-                if message_type in expected_informational:
-                    # These are normal informational messages, log at debug level
-                    pass  # Suppress to reduce log noise
-                else:
-                    logger.info("⚠️  Unhandled message type: %s", message_type)
+                logger.info("⚠️  Unhandled message type: %s", message_type)
                 
         except Exception as e:
-            logger.error(f"Error processing Voice Live message: {e}")
+            logger.error("Error processing Voice Live message: %s", e)
+    
+    async def _on_session_created(self, _message: str) -> None:
+        """In agent mode, session.created is enough to proceed."""
+        logger.info("Session created - starting AI response (Request ID: %s)", self.client_request_id)
+        await self._start_response()
+    
+    async def _on_session_updated(self, _message: str) -> None:
+        """Set connection ready for agent mode."""
+        logger.info("Session updated - connection ready (Request ID: %s)", self.client_request_id)
+        self.connection_ready.set()
+    
+    async def _on_audio_delta(self, message: str) -> None:
+        """Forward audio response to ACS, unless its response was cancelled by a barge-in."""
+        response_id = VoiceLiveEventParser.extract_string(message, "response_id")
+        if response_id in self._cancelled_response_ids:
+            LATE_DELTAS_DROPPED.inc()
+            return
+        if response_id:
+            self._active_response_id = response_id
+        logger.debug("🎵 Received audio delta from AI - forwarding to caller")
+        self.timeline.mark_audio_delta()
+        self._handle_audio_delta(VoiceLiveEventParser.extract_delta(message))
     
-    async def _handle_audio_delta(self, data: dict) -> None:
+    async def _on_speech_started(self, _message: str) -> None:
+        """Handle barge-in (voice activity detection)."""
+        logger.info("Voice activity detected - triggering barge-in")
+        self.timeline.mark_barge_in()
+        await self._handle_speech_started()
+    
+    async def _on_speech_stopped(self, _message: str) -> None:
+        """End of the caller's turn - start timing the reply."""
+        self.timeline.mark_speech_stopped()
+    
+    async def _on_audio_done(self, message: str) -> None:
+        """Release the trailing partial frame of the response."""
+        if VoiceLiveEventParser.extract_string(message, "response_id") in self._cancelled_response_ids:
+            return
+        self._handle_audio_done()
+    
+    async def _on_response_created(self, message: str) -> None:
+        """Track the response now being generated."""
+        self._active_response_id = json.loads(message).get("response", {}).get("id")
+        logger.info("AI response created")
+    
+    async def _on_response_done(self, message: str) -> None:
+        """Forget a finished response; no more deltas will arrive for it."""
+        response_id = json.loads(message).get("response", {}).get("id")
+        self._cancelled_response_ids.discard(response_id)
+        if response_id == self._active_response_id:
+            self._active_response_id = None
+        logger.info("AI response completed")
+    
+    async def _on_error(self, message: str) -> None:
+        """Log an error reported by the service."""
+        error_info = json.loads(message).get("error", {})
+        if error_info.get("code") == "response_cancel_not_active":
+            # The response finished, or the service cancelled it on speech_started, before our cancel arrived
+            logger.debug("Voice Live response already finished when cancelled")
+            return
+        logger.error("Voice Live API error: %s", error_info)
+    
+    def _handle_audio_delta(self, audio_delta: str) -> None:
         """
         Handle audio delta from Voice Live API and forward to ACS.
         
-        Resamples audio from 24kHz (Voice Live API) to 16kHz (ACS requirement).
-        Sends complete audio chunks immediately to avoid timing issues.
+        Decodes the audio and queues it for the downstream task, which
+        resamples it to the ACS media rate and hands it to the pacer. In
+        passthrough mode the base64 text is queued as is.
         
         Args:
-            data: Audio delta message data
+            audio_delta: Base64 audio from the delta event
         """
         try:
-            import base64
-            from models import OutboundAudioData
-            from audio_resampler import AudioResampler
-            
-            audio_delta = data.get("delta", "")
-            if audio_delta:
-                # Decode base64 audio data from Voice Live (24kHz)
+            if audio_delta and self.passthrough:
+                self._downstream_queue.put_nowait(audio_delta)
+            elif audio_delta:
+                # Decode base64 audio data from Voice Live
+                decode_start = time.perf_counter()
                 audio_bytes = base64.b64decode(audio_delta)
-                
-                # Resample from 24kHz (Voice Live) to 16kHz (ACS)
-                resampled_audio = AudioResampler.resample_24k_to_16k(audio_bytes)
-                
-                # Send entire resampled audio buffer immediately to avoid timing issues
-                if len(resampled_audio) > 0:
-                    outbound_message = OutboundAudioData.create(resampled_audio, "VoiceLiveAI")
-                    
-                    # Send to ACS - check WebSocket availability during graceful shutdown
-                    if self.media_handler and hasattr(self.media_handler, 'websocket') and self.media_handler.websocket:
-                        try:
-                            await self.media_handler.send_message(outbound_message)
-                        except Exception as e:
-                            # Only log errors that aren't due to normal connection closure
-                            if "1000" not in str(e) and "closed" not in str(e).lower():
-                                logger.error(f"Failed to send audio to ACS: {e}")
-                    elif self.media_handler:
-                        logger.warning("Media handler WebSocket not available - skipping audio send")
-                    else:
-                        logger.warning("No media handler available to send audio")
-                else:
-                    logger.warning("Resampled audio is empty")
+                DOWNSTREAM_DECODE_SECONDS.observe(time.perf_counter() - decode_start)
+                self._downstream_queue.put_nowait(audio_bytes)
             else:
                 logger.warning("Received empty audio delta")
                     
         except Exception as e:
-            logger.error(f"Error handling audio delta: {e}")
+            logger.error("Error handling audio delta: %s", e)
             logger.exception("Full audio delta error:")
     
+    def _handle_audio_done(self) -> None:
+        """Mark the end of a response's audio so the trailing partial frame is released."""
+        self._downstream_queue.put_nowait(None)
+    
     async def _handle_speech_started(self) -> None:
-        """Handle speech started event (barge-in scenario)."""
+        """
+        Handle speech started event (barge-in scenario).
+        
+        Stops playback to the caller first, then cancels the interrupted
+        response so Voice Live stops generating it; deltas of that response
+        still in flight are dropped on arrival.
+        """
         try:
-            from models import StopAudioData
+            # Drop response audio not yet resampled, and any being resampled now
+            self._barge_in_epoch += 1
+            self._downstream_queue.clear()
+            
+            # Drop paced audio that has not reached ACS yet, then stop playback
+            if self.media_handler and getattr(self.media_handler, 'outbound_pacer', None):
+                self.media_handler.outbound_pacer.flush()
+                self.media_handler.outbound_pacer.send_control(self.outbound_encoder.encode_stop())
+            elif self.media_handler:
+                await self.media_handler.send_message(self.outbound_encoder.encode_stop())
+                self.timeline.mark_stop_sent()
             
-            # Send stop audio message to ACS
-            stop_message = StopAudioData.create()
-            if self.media_handler:
-                await self.media_handler.send_message(stop_message)
+            # Stop generating the response the caller talked over
+            if self._active_response_id:
+                self._cancelled_response_ids.add(self._active_response_id)
+                self._active_response_id = None
+                CANCELLED_RESPONSES.inc()
+                await self.send_message(ResponseCancel.create())
                 
         except Exception as e:
-            logger.error(f"Error handling speech started: {e}")
+            logger.error("Error handling speech started: %s", e)
     
     async def send_message(self, message: str) -> None:
         """
         Send raw message to Voice Live API.
         
+        The message is queued as a control message and sent ahead of any
+        queued audio; this never waits, so it is safe from the reader task.
+        
         Args:
             message: JSON message string
         """
         if self.websocket and self.running:
-            try:
-                await self.websocket.send(message)
-            except Exception as e:
-                logger.error(f"Error sending message to Voice Live: {e}")
+            self._queue_control(message)
         else:
             logger.warning("Cannot send message - Voice Live not connected")
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Offline multi-call load harness for the ACS <-> Voice Live bridge.
+
+Starts the bridge with uvicorn in a subprocess, pointed at a stub Voice Live
+WebSocket server run by this script (``VOICE_LIVE_URL_OVERRIDE``, so no Azure
+tokens are needed). N fake ACS callers then connect to ``/ws`` and stream
+AudioMetadata/AudioData JSON at real-time pace, alternating speech and
+pauses. The stub answers like Voice Live: ``session.created`` and
+``session.updated``, speech start/stop detection on the appended audio, and
+paced ``response.audio.delta`` streams after each turn.
+
+For each call count the harness reports:
+
+- turn latency seen by the caller: end of speech to first response frame,
+  which includes the stub's VAD silence and model delay
+- the bridge's own turn latency histogram from ``/metrics``
+- event loop lag p50/p99 and bridge CPU, from ``/metrics``
+- CPU per call, and the largest call count that stayed within the loop lag
+  budget, with a per-core estimate
+
+CPU is the bridge's main process only; DSP worker processes are not counted.
+The fake callers and the stub run on this script's event loop, so run it on
+a machine with a spare core.
+
+Usage:
+    python benchmarks/call_load_harness.py --calls 10,25,50,100 --seconds 20
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import websockets
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+FRAME_SECONDS = 0.02
+ACS_SAMPLE_RATE = 16000
+VOICE_LIVE_SAMPLE_RATE = 24000
+DELTA_SECONDS = 0.1  # Audio per response.audio.delta
+SPEECH_PEAK = 1500  # Stub VAD: int16 peak above this is speech
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def tone(sample_rate: int, seconds: float, amplitude: int = 4000) -> bytes:
+    """16-bit mono 440 Hz tone."""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (np.sin(2 * np.pi * 440 * t) * amplitude).astype(np.int16).tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Stub Voice Live server
+# ---------------------------------------------------------------------------
+
+class StubVoiceLive:
+    """Minimal Voice Live agent endpoint with energy VAD and paced replies."""
+    
+    def __init__(self, vad_silence_ms: int, model_delay_ms: int, response_seconds: float, delta_speedup: float):
+        self.vad_silence = vad_silence_ms / 1000
+        self.model_delay = model_delay_ms / 1000
+        self.response_seconds = response_seconds
+        self.delta_speedup = delta_speedup
+        self.delta_b64 = base64.b64encode(tone(VOICE_LIVE_SAMPLE_RATE, DELTA_SECONDS)).decode("ascii")
+    
+    async def handle(self, websocket, _path: str = "/") -> None:
+        """Serve one Voice Live session."""
+        speaking = False
+        silence = 0.0
+        response: Optional[asyncio.Task] = None
+        active_response_id: Optional[str] = None
+        
+        async def send(event: dict) -> None:
+            event.setdefault("event_id", "event_" + uuid.uuid4().hex[:12])
+            await websocket.send(json.dumps(event))
+        
+        async def respond(delay: float) -> None:
+            nonlocal active_response_id
+            await asyncio.sleep(delay)
+            response_id = active_response_id = "resp_" + uuid.uuid4().hex[:12]
+            try:
+                await send({"type": "response.created", "response": {"id": response_id}})
+                pace = DELTA_SECONDS / self.delta_speedup
+                next_at = time.monotonic()
+                for _ in range(max(1, int(self.response_seconds / DELTA_SECONDS))):
+                    await send({
+                        "type": "response.audio.delta", "response_id": response_id, "item_id": "item_1",
+                        "output_index": 0, "content_index": 0, "delta": self.delta_b64
+                    })
+                    next_at += pace
+                    await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+                await send({"type": "response.audio.done", "response_id": response_id})
+                await send({"type": "response.done", "response": {"id": response_id, "status": "completed"}})
+            except websockets.exceptions.ConnectionClosed:
+                pass
+        
+        try:
+            await send({"type": "session.created", "session": {"id": "sess_" + uuid.uuid4().hex[:12]}})
+            async for raw in websocket:
+                event = json.loads(raw)
+                event_type = event.get("type")
+                if event_type == "session.update":
+                    await send({"type": "session.updated", "session": event.get("session", {})})
+                elif event_type == "response.create":
+                    response = asyncio.create_task(respond(0.0))  # Agent greeting
+                elif event_type == "response.cancel":
+                    if response and not response.done():
+                        response.cancel()
+                        await send({"type": "response.done", "response": {"id": active_response_id, "status": "cancelled"}})
+                    else:
+                        await send({"type": "error", "error": {
+                            "type": "invalid_request_error", "code": "response_cancel_not_active"
+                        }})
+                elif event_type == "input_audio_buffer.append":
+                    audio = np.frombuffer(base64.b64decode(event["audio"]), dtype=np.int16)
+                    if len(audio) and int(np.abs(audio).max()) > SPEECH_PEAK:
+                        silence = 0.0
+                        if not speaking:
+                            speaking = True
+                            await send({"type": "input_audio_buffer.speech_started"})
+                    elif speaking:
+                        silence += len(audio) / VOICE_LIVE_SAMPLE_RATE
+                        if silence >= self.vad_silence:
+                            speaking = False
+                            await send({"type": "input_audio_buffer.speech_stopped"})
+                            response = asyncio.create_task(respond(self.model_delay))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if response and not response.done():
+                response.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Fake ACS caller
+# ---------------------------------------------------------------------------
+
+class FakeCaller:
+    """ACS media stream for one call: speech/pause cycles at real-time pace."""
+    
+    def __init__(self, url: str, speech_seconds: float, pause_seconds: float, sample_rate: int = ACS_SAMPLE_RATE):
+        self.url = url
+        self.sample_rate = sample_rate
+        self.speech_frames = int(speech_seconds / FRAME_SECONDS)
+        self.cycle_frames = self.speech_frames + int(pause_seconds / FRAME_SECONDS)
+        self.turn_latencies: List[float] = []
+        self.failed: Optional[str] = None
+        self._speech_ended_at: Optional[float] = None
+    
+    @staticmethod
+    def audio_message(audio: bytes, silent: bool) -> str:
+        """ACS AudioData JSON for one 20 ms frame."""
+        return json.dumps({
+            "kind": "AudioData",
+            "audioData": {
+                "timestamp": "2024-01-01T00:00:00.000Z",
+                "participantRawID": "8:acs:load-harness",
+                "data": base64.b64encode(audio).decode("ascii"),
+                "silent": silent
+            }
+        })
+    
+    async def run(self, stop: asyncio.Event, start_delay: float) -> None:
+        """Stream audio until ``stop`` is set."""
+        speech = self.audio_message(tone(self.sample_rate, FRAME_SECONDS), False)
+        # Pauses are digital silence; the bridge forwards it so the stub's
+        # VAD hears the end of speech
+        pause = self.audio_message(bytes(self.sample_rate // 50 * 2), False)
+        metadata = json.dumps({
+            "kind": "AudioMetadata",
+            "audioMetadata": {
+                "subscriptionId": str(uuid.uuid4()), "encoding": "PCM",
+                "sampleRate": self.sample_rate, "channels": 1, "length": self.sample_rate // 50 * 2
+            }
+        })
+        await asyncio.sleep(start_delay)
+        try:
+            async with websockets.connect(self.url, max_size=None) as websocket:
+                receiver = asyncio.create_task(self._receive(websocket))
+                await websocket.send(metadata)
+                frame = 0
+                next_at = time.monotonic()
+                while not stop.is_set():
+                    position = frame % self.cycle_frames
+                    await websocket.send(speech if position < self.speech_frames else pause)
+                    if position == self.speech_frames:
+                        self._speech_ended_at = time.monotonic()
+                    frame += 1
+                    next_at += FRAME_SECONDS
+                    await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+                receiver.cancel()
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            self.failed = str(e)
+    
+    async def _receive(self, websocket) -> None:
+        """Record the first response frame after each end of speech."""
+        try:
+            async for message in websocket:
+                if '"kind":"AudioData"' not in message or '"silent":true' in message:
+                    continue
+                if self._speech_ended_at is not None:
+                    self.turn_latencies.append(time.monotonic() - self._speech_ended_at)
+                    self._speech_ended_at = None
+        except websockets.exceptions.ConnectionClosed as e:
+            self.failed = self.failed or f"closed by bridge: {e}"
+
+
+# ---------------------------------------------------------------------------
+# Bridge process and metrics
+# ---------------------------------------------------------------------------
+
+def start_bridge(port: int, voice_live_url: str, dsp_workers: int, verbose: bool) -> subprocess.Popen:
+    """Run the bridge with uvicorn, configured for the stub Voice Live server."""
+    env = dict(os.environ)
+    env.update({
+        "ACS_CONNECTION_STRING": "endpoint=https://load-harness.communication.azure.com/;accesskey=bG9hZC1oYXJuZXNz",
+        "AZURE_VOICE_LIVE_ENDPOINT": "https://load-harness.cognitiveservices.azure.com/",
+        "AGENT_ID": "load-harness",
+        "AGENT_PROJECT_NAME": "load-harness",
+        "VOICE_LIVE_URL_OVERRIDE": voice_live_url,
+        "DSP_WORKERS": str(dsp_workers),
+        "MAX_CONCURRENT_CALLS": "0",
+        "LOG_LEVEL": "INFO" if verbose else "WARNING"
+    })
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--no-access-log", "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=output, stderr=output
+    )
+
+
+def http_get(url: str) -> str:
+    """Blocking GET returning the response body; run it in a thread."""
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read().decode("utf-8")
+
+
+async def wait_until_up(base_url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    """Poll /health until the bridge answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"bridge exited with code {process.returncode}")
+        try:
+            await asyncio.to_thread(http_get, base_url + "/health")
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("bridge did not start in time")
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Parse OpenMetrics samples into ``{"name{labels}": value}``."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def histogram_delta(before: Dict[str, float], after: Dict[str, float], name: str) -> List[Tuple[float, float]]:
+    """Per-bucket (upper bound, count) observed between two scrapes, summed over label sets."""
+    buckets: Dict[float, float] = {}
+    prefix = name + "_bucket{"
+    for key, value in after.items():
+        if key.startswith(prefix):
+            bound = key.rsplit('le="', 1)[1].rstrip('"}')
+            upper = float("inf") if bound == "+Inf" else float(bound)
+            buckets[upper] = buckets.get(upper, 0.0) + value - before.get(key, 0.0)
+    return sorted(buckets.items())
+
+
+def histogram_quantile(buckets: List[Tuple[float, float]], q: float) -> float:
+    """Upper bound of the bucket containing quantile ``q`` (cumulative buckets)."""
+    if not buckets or not buckets[-1][1]:
+        return 0.0
+    rank = q * buckets[-1][1]
+    for upper, cumulative in buckets:
+        if cumulative >= rank:
+            return upper
+    return buckets[-1][0]
+
+
+async def scrape(base_url: str) -> Tuple[float, Dict[str, float]]:
+    """Read /metrics, returning the scrape time and parsed samples."""
+    return time.monotonic(), parse_metrics(await asyncio.to_thread(http_get, base_url + "/metrics"))
+
+
+async def run_step(args: argparse.Namespace, base_url: str, ws_url: str, calls: int) -> dict:
+    """Run ``calls`` concurrent callers and measure the steady state."""
+    stop = asyncio.Event()
+    callers = [
+        FakeCaller(ws_url, args.speech_seconds, args.pause_seconds, args.acs_sample_rate) for _ in range(calls)
+    ]
+    # Stagger starts over one speech/pause cycle so turns do not line up
+    cycle = args.speech_seconds + args.pause_seconds
+    tasks = [asyncio.create_task(caller.run(stop, i * cycle / calls)) for i, caller in enumerate(callers)]
+    
+    await asyncio.sleep(cycle + args.warmup)
+    for caller in callers:
+        caller.turn_latencies.clear()
+    started, before = await scrape(base_url)
+    await asyncio.sleep(args.seconds)
+    ended, after = await scrape(base_url)
+    stop.set()
+    await asyncio.gather(*tasks)
+    
+    # Let the bridge clean up before the next step
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if json.loads(await asyncio.to_thread(http_get, base_url + "/capacity"))["active_calls"] == 0:
+            break
+        await asyncio.sleep(0.2)
+    
+    elapsed = ended - started
+    cpu = (after.get("process_cpu_seconds_total", 0) - before.get("process_cpu_seconds_total", 0)) / elapsed * 100
+    lag = histogram_delta(before, after, "voice_bridge_event_loop_lag_seconds")
+    bridge_turns = histogram_delta(before, after, "voice_bridge_turn_latency_seconds")
+    latencies = sorted(latency for caller in callers for latency in caller.turn_latencies)
+    return {
+        "calls": calls,
+        "failed": sum(1 for caller in callers if caller.failed),
+        "turns": len(latencies),
+        "turn_p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "turn_p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if len(latencies) >= 20 else float("nan"),
+        "bridge_turn_p50_ms": histogram_quantile(bridge_turns, 0.5) * 1000,
+        "lag_p50_ms": histogram_quantile(lag, 0.5) * 1000,
+        "lag_p99_ms": histogram_quantile(lag, 0.99) * 1000,
+        "cpu_percent": cpu,
+        "cpu_per_call": cpu / calls
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Start the stub and the bridge, run every step and print the results."""
+    stub = StubVoiceLive(args.vad_silence_ms, args.model_delay_ms, args.response_seconds, args.delta_speedup)
+    stub_port = free_port()
+    bridge_port = free_port()
+    base_url = f"http://127.0.0.1:{bridge_port}"
+    
+    async with websockets.serve(stub.handle, "127.0.0.1", stub_port, max_size=None):
+        bridge = start_bridge(bridge_port, f"ws://127.0.0.1:{stub_port}/", args.dsp_workers, args.verbose)
+        try:
+            await wait_until_up(base_url, bridge)
+            print(f"Bridge on :{bridge_port}, stub Voice Live on :{stub_port}; "
+                  f"{args.seconds:.0f}s measured per step, stub adds "
+                  f"{args.vad_silence_ms + args.model_delay_ms} ms (VAD silence + model delay) to each turn")
+            header = (f"{'calls':>6}{'failed':>8}{'turns':>7}{'turn p50':>10}{'turn p95':>10}{'bridge p50':>12}"
+                      f"{'lag p50':>9}{'lag p99':>9}{'CPU %':>8}{'CPU/call':>10}")
+            print(header)
+            results = []
+            for calls in args.calls:
+                result = await run_step(args, base_url, f"ws://127.0.0.1:{bridge_port}/ws", calls)
+                results.append(result)
+                print(f"{result['calls']:>6}{result['failed']:>8}{result['turns']:>7}"
+                      f"{result['turn_p50_ms']:>10.0f}{result['turn_p95_ms']:>10.0f}{result['bridge_turn_p50_ms']:>12.0f}"
+                      f"{result['lag_p50_ms']:>9.1f}{result['lag_p99_ms']:>9.1f}"
+                      f"{result['cpu_percent']:>8.1f}{result['cpu_per_call']:>10.2f}")
+        finally:
+            bridge.terminate()
+            try:
+                bridge.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                bridge.kill()
+    
+    sustained = [r for r in results if not r["failed"] and r["lag_p99_ms"] <= args.max_lag_ms and r["cpu_percent"] < 100]
+    if sustained:
+        best = max(sustained, key=lambda r: r["calls"])
+        print(f"\nSustained {best['calls']} calls within {args.max_lag_ms:.0f} ms loop lag p99; "
+              f"at {best['cpu_per_call']:.2f}% CPU per call that is ~{int(100 / best['cpu_per_call'])} calls per core")
+    else:
+        print(f"\nNo step stayed within {args.max_lag_ms:.0f} ms loop lag p99")
+
+
+def main() -> None:
+    """Parse arguments and run the load steps."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=lambda v: [int(n) for n in v.split(",")], default=[10, 25, 50],
+                        help="Comma-separated concurrent call counts, one step each")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Measured duration of each step")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Extra settle time after calls connect")
+    parser.add_argument("--speech-seconds", type=float, default=1.5, help="Caller speech per turn")
+    parser.add_argument("--pause-seconds", type=float, default=4.0, help="Caller pause per turn (covers the reply)")
+    parser.add_argument("--vad-silence-ms", type=int, default=300, help="Stub silence before speech_stopped")
+    parser.add_argument("--model-delay-ms", type=int, default=200, help="Stub delay before the first delta")
+    parser.add_argument("--response-seconds", type=float, default=2.0, help="Stub reply length")
+    parser.add_argument("--delta-speedup", type=float, default=2.0, help="Stub delta rate relative to real time")
+    parser.add_argument("--acs-sample-rate", type=int, choices=[16000, 24000], default=ACS_SAMPLE_RATE,
+                        help="Caller media rate; 24000 exercises the passthrough path")
+    parser.add_argument("--dsp-workers", type=int, default=0, help="DSP_WORKERS for the bridge")
+    parser.add_argument("--max-lag-ms", type=float, default=50.0, help="Loop lag p99 budget for a sustained step")
+    parser.add_argument("--verbose", action="store_true", help="Show bridge logs")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Event loop lag benchmark for inline DSP versus the DSP worker pool.
+
+Simulates N concurrent calls on one event loop. Every 20 ms each call
+resamples one ACS frame upstream (16kHz -> 24kHz) and one Voice Live frame
+downstream (24kHz -> 16kHz), either inline or through ``DSPWorkerPool``.
+A probe task measures how late the loop wakes it up, which is the jitter
+every call hosted on the loop experiences.
+
+Usage:
+    python benchmarks/dsp_pool_loop_lag_benchmark.py --calls 100 --workers 2
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Allow running from the repository root or the benchmarks folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dsp_pool import DSPWorkerPool, InlineResamplerStream
+
+FRAME_SECONDS = 0.02
+PROBE_SECONDS = 0.005
+
+
+async def simulate_call(open_stream, stop_at: float) -> None:
+    """Resample one frame in each direction every 20 ms until stop_at."""
+    rng = np.random.default_rng()
+    upstream = open_stream(16000, 24000)
+    downstream = open_stream(24000, 16000)
+    acs_frame = rng.integers(-8000, 8000, 320).astype(np.int16).tobytes()
+    ai_frame = rng.integers(-8000, 8000, 480).astype(np.int16).tobytes()
+    
+    # Stagger call start so frames are spread across the 20 ms period
+    next_frame = time.monotonic() + rng.random() * FRAME_SECONDS
+    try:
+        while next_frame < stop_at:
+            await asyncio.sleep(max(0.0, next_frame - time.monotonic()))
+            await upstream.resample(acs_frame)
+            await downstream.resample(ai_frame)
+            next_frame += FRAME_SECONDS
+    finally:
+        upstream.close()
+        downstream.close()
+
+
+async def probe_loop_lag(stop_at: float, samples: list) -> None:
+    """Record how late each short sleep wakes up, in milliseconds."""
+    while time.monotonic() < stop_at:
+        started = time.monotonic()
+        await asyncio.sleep(PROBE_SECONDS)
+        samples.append((time.monotonic() - started - PROBE_SECONDS) * 1000)
+
+
+async def run(calls: int, seconds: float, workers: int) -> dict:
+    """Run one scenario and return loop lag and CPU statistics."""
+    pool = None
+    if workers > 0:
+        pool = DSPWorkerPool(workers)
+        pool.start()
+        open_stream = pool.open_stream
+    else:
+        open_stream = InlineResamplerStream
+    
+    lag_samples: list = []
+    cpu_start = time.process_time()
+    stop_at = time.monotonic() + seconds
+    await asyncio.gather(
+        probe_loop_lag(stop_at, lag_samples),
+        *(simulate_call(open_stream, stop_at) for _ in range(calls))
+    )
+    loop_cpu = time.process_time() - cpu_start
+    
+    if pool:
+        await pool.stop()
+    
+    lag_samples.sort()
+    return {
+        "p50": statistics.median(lag_samples),
+        "p99": lag_samples[int(len(lag_samples) * 0.99) - 1],
+        "max": lag_samples[-1],
+        "loop_cpu": loop_cpu / seconds * 100
+    }
+
+
+def main() -> None:
+    """Parse arguments, run both scenarios and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100, help="Concurrent simulated calls")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each scenario")
+    parser.add_argument("--workers", type=int, default=2, help="DSP worker processes for the pool run")
+    args = parser.parse_args()
+    
+    print(f"{args.calls} calls, {args.seconds:.0f}s per scenario")
+    print(f"{'mode':<16}{'lag p50 (ms)':>14}{'lag p99 (ms)':>14}{'lag max (ms)':>14}{'main CPU %':>12}")
+    for label, workers in (("inline", 0), (f"pool x{args.workers}", args.workers)):
+        result = asyncio.run(run(args.calls, args.seconds, workers))
+        print(f"{label:<16}{result['p50']:>14.2f}{result['p99']:>14.2f}{result['max']:>14.2f}{result['loop_cpu']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
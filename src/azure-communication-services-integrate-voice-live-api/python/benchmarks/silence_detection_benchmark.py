@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for per-packet silence detection on the upstream audio path.
+
+Compares the original byte-wise ``max(audio_bytes)`` scan with the numpy
+int16 peak detector in ``AudioHelper.is_silent_audio`` for a 20 ms ACS frame
+(16kHz) and the resampled 20 ms frame sent to Voice Live (24kHz).
+
+Usage:
+    python benchmarks/silence_detection_benchmark.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+# Allow running from the repository root or the benchmarks folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from helpers import AudioHelper
+
+ITERATIONS = 20000
+
+
+def legacy_is_silent_audio(audio_bytes: bytes, threshold: float = 0.01) -> bool:
+    """Original byte-wise silence check, kept here only as a baseline."""
+    if not audio_bytes:
+        return True
+    max_value = max(audio_bytes) if audio_bytes else 0
+    return max_value < (threshold * 255)
+
+
+def make_frame(sample_rate: int, amplitude: int) -> bytes:
+    """Build a 20 ms 16-bit mono frame of noise at the given amplitude."""
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-amplitude, amplitude + 1, sample_rate // 50)
+    return samples.astype(np.int16).tobytes()
+
+
+def per_packet_us(func, frame: bytes) -> float:
+    """Return mean microseconds per call."""
+    return timeit.timeit(lambda: func(frame), number=ITERATIONS) / ITERATIONS * 1e6
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    print(f"{'frame':<24}{'legacy (us)':>14}{'numpy (us)':>14}{'speedup':>10}")
+    for label, sample_rate, amplitude in (
+        ("16kHz 20ms speech", 16000, 8000),
+        ("16kHz 20ms quiet", 16000, 50),
+        ("24kHz 20ms speech", 24000, 8000),
+        ("24kHz 20ms quiet", 24000, 50),
+    ):
+        frame = make_frame(sample_rate, amplitude)
+        legacy = per_packet_us(legacy_is_silent_audio, frame)
+        current = per_packet_us(AudioHelper.is_silent_audio, frame)
+        print(f"{label:<24}{legacy:>14.2f}{current:>14.2f}{legacy / current:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
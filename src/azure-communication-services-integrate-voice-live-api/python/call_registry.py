@@ -0,0 +1,205 @@
+"""
+In-process registry of live calls.
+Correlates the Event Grid incoming call, Call Automation callbacks and the
+ACS media WebSocket of each call through its context id and call connection id.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from capacity import RESERVATION_TTL_SECONDS
+from metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+class CallState:
+    """
+    Per-call state shared by the endpoints that handle one call.
+    
+    Timings are monotonic marks, recorded once each and reported relative
+    to ``created_at``.
+    """
+    __slots__ = (
+        "context_id", "caller_id", "call_connection_id", "state", "last_event_type",
+        "media_handler", "voice_live_service", "started_at",
+        "created_at", "answered_at", "connected_at", "media_connected_at", "_expiry"
+    )
+    
+    def __init__(self, context_id: str, caller_id: Optional[str] = None):
+        self.context_id = context_id
+        self.caller_id = caller_id
+        self.call_connection_id: Optional[str] = None
+        self.state = "answering"
+        self.last_event_type: Optional[str] = None
+        self.media_handler: Any = None
+        self.voice_live_service: Any = None
+        self.started_at = datetime.utcnow()
+        self.created_at = time.monotonic()
+        self.answered_at: Optional[float] = None
+        self.connected_at: Optional[float] = None
+        self.media_connected_at: Optional[float] = None
+        self._expiry: Optional[asyncio.TimerHandle] = None
+    
+    def _since_created_ms(self, mark: Optional[float]) -> Optional[float]:
+        return round((mark - self.created_at) * 1000, 1) if mark is not None else None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Summarize the call for the ``/calls`` endpoint.
+        
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        handler = self.media_handler
+        return {
+            "context_id": self.context_id,
+            "call_connection_id": self.call_connection_id,
+            "caller_id": self.caller_id,
+            "state": self.state,
+            "last_event_type": self.last_event_type,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(time.monotonic() - self.created_at, 1),
+            "answer_ms": self._since_created_ms(self.answered_at),
+            "connected_ms": self._since_created_ms(self.connected_at),
+            "media_connected_ms": self._since_created_ms(self.media_connected_at),
+            "turns": handler.timeline.turns if handler is not None else 0
+        }
+
+
+class CallRegistry:
+    """
+    Live calls indexed by context id and by call connection id.
+    
+    A call is created when its incoming call event is admitted, gains a
+    call connection id once answered, and is removed when its media stream
+    ends, when ACS reports it disconnected, or when answering fails. A call
+    whose media stream never arrives is dropped after
+    ``connect_timeout_seconds``. Every lookup is a dictionary access, and
+    everything runs on the event loop thread, so no locking is needed.
+    """
+    
+    def __init__(self, connect_timeout_seconds: float = RESERVATION_TTL_SECONDS):
+        """
+        Initialize call registry.
+        
+        Args:
+            connect_timeout_seconds: How long an answered call may wait for its media stream
+        """
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self._by_context: Dict[str, CallState] = {}
+        self._by_connection: Dict[str, CallState] = {}
+    
+    def __len__(self) -> int:
+        return len(self._by_context)
+    
+    def create(self, context_id: str, caller_id: Optional[str] = None) -> CallState:
+        """
+        Register an admitted incoming call.
+        
+        Args:
+            context_id: Context id carried on the callback and media WebSocket URLs
+            caller_id: Raw id of the caller
+        
+        Returns:
+            The new call state
+        """
+        call = CallState(context_id, caller_id)
+        self._by_context[context_id] = call
+        call._expiry = asyncio.get_running_loop().call_later(
+            self.connect_timeout_seconds, self._expire, context_id
+        )
+        return call
+    
+    def get(self, context_id: Optional[str]) -> Optional[CallState]:
+        """Look up a call by context id."""
+        return self._by_context.get(context_id) if context_id else None
+    
+    def get_by_connection(self, call_connection_id: Optional[str]) -> Optional[CallState]:
+        """Look up a call by Call Automation call connection id."""
+        return self._by_connection.get(call_connection_id) if call_connection_id else None
+    
+    def set_call_connection_id(self, context_id: str, call_connection_id: Optional[str]) -> None:
+        """Index an answered call by its call connection id."""
+        call = self._by_context.get(context_id)
+        if call is None or not call_connection_id:
+            return
+        if call.call_connection_id and call.call_connection_id != call_connection_id:
+            self._by_connection.pop(call.call_connection_id, None)
+        call.call_connection_id = call_connection_id
+        self._by_connection[call_connection_id] = call
+    
+    def attach_media(self, context_id: Optional[str], media_handler: Any) -> CallState:
+        """
+        Attach the media handler of a call whose ACS media WebSocket connected.
+        
+        A media stream with no known context id (e.g. connected directly to
+        ``/ws``) is registered as a call of its own so it is still listed.
+        
+        Args:
+            context_id: Context id from the media WebSocket URL
+            media_handler: ACS media streaming handler for the call
+        
+        Returns:
+            The call state
+        """
+        call = self.get(context_id)
+        if call is None:
+            call = CallState(context_id or str(uuid.uuid4()))
+            self._by_context[call.context_id] = call
+        if call._expiry is not None:
+            call._expiry.cancel()
+            call._expiry = None
+        call.media_handler = media_handler
+        call.voice_live_service = media_handler.voice_live_service or call.voice_live_service
+        call.media_connected_at = time.monotonic()
+        call.state = "streaming"
+        return call
+    
+    def remove(self, context_id: Optional[str]) -> Optional[CallState]:
+        """
+        Forget a call that has ended.
+        
+        Returns:
+            The removed call state, or None if the call was not registered
+        """
+        call = self._by_context.pop(context_id, None) if context_id else None
+        if call is None:
+            return None
+        if call._expiry is not None:
+            call._expiry.cancel()
+            call._expiry = None
+        if call.call_connection_id:
+            self._by_connection.pop(call.call_connection_id, None)
+        call.state = "ended"
+        call.media_handler = None
+        call.voice_live_service = None
+        return call
+    
+    def calls(self) -> List[CallState]:
+        """Every live call, oldest first."""
+        return list(self._by_context.values())
+    
+    def list_calls(self) -> List[Dict[str, Any]]:
+        """Snapshot every live call, oldest first."""
+        return [call.snapshot() for call in self._by_context.values()]
+    
+    def _expire(self, context_id: str) -> None:
+        """Drop an answered call whose media stream never arrived."""
+        call = self._by_context.get(context_id)
+        if call is not None and call.media_handler is None:
+            logger.warning("Media stream for context %s never connected - forgetting call", context_id)
+            call._expiry = None
+            self.remove(context_id)
+
+
+# Process-wide registry shared by the Event Grid, callback and media WebSocket endpoints
+call_registry = CallRegistry()
+
+TRACKED_CALLS = Gauge(
+    "voice_bridge_tracked_calls", "Calls in the call registry, from answer to hang-up",
+    callback=lambda: len(call_registry)
+)
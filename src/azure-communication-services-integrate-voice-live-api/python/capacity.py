@@ -0,0 +1,281 @@
+"""
+Admission control for concurrent calls.
+Tracks active calls, process CPU and event loop lag, and decides whether
+this instance can take another call without degrading the ones it has.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import settings
+from dsp_pool import get_dsp_pool
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Lag probe period and the window that recent percentiles are computed over
+LOOP_LAG_INTERVAL_SECONDS = 0.05
+LOOP_LAG_WINDOW_SECONDS = 10.0
+
+# CPU utilization is sampled over this period
+CPU_SAMPLE_SECONDS = 1.0
+
+# An admitted call counts against capacity until its media WebSocket
+# arrives, or until this long has passed without one
+RESERVATION_TTL_SECONDS = 30.0
+
+LOOP_LAG_SECONDS = Histogram(
+    "voice_bridge_event_loop_lag_seconds",
+    "How late the event loop woke a periodic probe task",
+    (0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+)
+REJECTED_CALLS = Counter("voice_bridge_calls_refused", "Incoming calls refused by admission control", {"action": "reject"})
+REDIRECTED_CALLS = Counter("voice_bridge_calls_refused", "Incoming calls refused by admission control", {"action": "redirect"})
+
+
+class CapacityManager:
+    """
+    Per-process view of call load used to admit or refuse new calls.
+    
+    Load is measured four ways, each with an optional limit (0 disables it):
+    
+    - calls: active media handlers plus calls admitted but not yet streaming
+    - CPU: process CPU time over wall time, in percent of one core
+    - loop lag: p99 of how late a periodic probe task is woken, over the
+      last ``LOOP_LAG_WINDOW_SECONDS``
+    - DSP queue: packets in flight in the DSP worker pool, if it runs
+    
+    While ``draining`` is set (see ``drain.py``) every new call is refused
+    and the instance reports not ready, whatever the load.
+    
+    Everything runs on the event loop thread, so no locking is needed.
+    """
+    
+    def __init__(self, max_calls: int = 0, max_cpu_percent: float = 0.0, max_loop_lag_ms: float = 0.0,
+                 max_dsp_queue_depth: int = 0):
+        """
+        Initialize capacity manager.
+        
+        Args:
+            max_calls: Maximum concurrent calls (0 = unlimited)
+            max_cpu_percent: CPU utilization above which new calls are refused (0 = no limit)
+            max_loop_lag_ms: Loop lag p99 above which new calls are refused (0 = no limit)
+            max_dsp_queue_depth: DSP packets in flight above which new calls are refused (0 = no limit)
+        """
+        self.max_calls = max_calls
+        self.max_cpu_percent = max_cpu_percent
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_dsp_queue_depth = max_dsp_queue_depth
+        
+        self.active_handlers: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self._reservations: Dict[str, float] = {}  # context id -> monotonic expiry
+        
+        self.draining = False
+        self.cpu_percent = 0.0
+        self._lag_samples: Deque[float] = deque(maxlen=int(LOOP_LAG_WINDOW_SECONDS / LOOP_LAG_INTERVAL_SECONDS))
+        self._monitor_task: Optional[asyncio.Task] = None
+    
+    @property
+    def active_calls(self) -> int:
+        """Calls streaming media plus calls admitted and still connecting."""
+        self._expire_reservations()
+        return len(self.active_handlers) + len(self._reservations)
+    
+    def register(self, handler: Any) -> None:
+        """Count a media handler as an active call."""
+        self.active_handlers.add(handler)
+    
+    def unregister(self, handler: Any) -> None:
+        """Stop counting a media handler once its call has ended."""
+        self.active_handlers.discard(handler)
+    
+    @property
+    def dsp_queue_depth(self) -> int:
+        """Packets in flight in the DSP worker pool (0 when DSP runs inline)."""
+        pool = get_dsp_pool()
+        return pool.queue_depth if pool is not None else 0
+    
+    def release(self, context_id: Optional[str]) -> None:
+        """Drop the reservation of an admitted call (its media stream arrived, or it failed)."""
+        if context_id:
+            self._reservations.pop(context_id, None)
+    
+    def loop_lag_percentile(self, q: float) -> float:
+        """
+        Loop lag percentile over the recent window.
+        
+        Args:
+            q: Quantile between 0.0 and 1.0
+        
+        Returns:
+            Lag in milliseconds, or 0.0 before the first sample
+        """
+        if not self._lag_samples:
+            return 0.0
+        samples = sorted(self._lag_samples)
+        return samples[min(int(q * len(samples)), len(samples) - 1)] * 1000
+    
+    def try_admit(self, context_id: str) -> Tuple[bool, str]:
+        """
+        Decide whether to take a new call, reserving capacity if so.
+        
+        Args:
+            context_id: Context id of the incoming call
+        
+        Returns:
+            Tuple of (admitted, reason); reason explains a refusal
+        """
+        reasons = self.saturation_reasons()
+        if reasons:
+            return False, "; ".join(reasons)
+        
+        self._reservations[context_id] = time.monotonic() + RESERVATION_TTL_SECONDS
+        return True, ""
+    
+    def saturation_reasons(self) -> List[str]:
+        """
+        Check every enabled limit.
+        
+        Returns:
+            One description per limit that is reached; empty when there is room
+        """
+        reasons = []
+        if self.draining:
+            reasons.append("draining for shutdown")
+        if self.max_calls and self.active_calls >= self.max_calls:
+            reasons.append(f"call limit reached ({self.max_calls})")
+        if self.max_cpu_percent and self.cpu_percent >= self.max_cpu_percent:
+            reasons.append(f"CPU at {self.cpu_percent:.0f}% (limit {self.max_cpu_percent:.0f}%)")
+        lag_ms = self.loop_lag_percentile(0.99)
+        if self.max_loop_lag_ms and lag_ms >= self.max_loop_lag_ms:
+            reasons.append(f"event loop lag p99 {lag_ms:.0f} ms (limit {self.max_loop_lag_ms:.0f} ms)")
+        dsp_depth = self.dsp_queue_depth
+        if self.max_dsp_queue_depth and dsp_depth >= self.max_dsp_queue_depth:
+            reasons.append(f"DSP queue depth {dsp_depth} (limit {self.max_dsp_queue_depth})")
+        return reasons
+    
+    def headroom(self) -> Dict[str, Any]:
+        """
+        Report current load against each limit.
+        
+        ``headroom`` is the smallest remaining fraction across the enabled
+        limits, from 1.0 (idle) to 0.0 (saturated).
+        
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        active_calls = self.active_calls
+        lag_p99_ms = self.loop_lag_percentile(0.99)
+        remaining = [1.0]
+        if self.max_calls:
+            remaining.append(1.0 - active_calls / self.max_calls)
+        if self.max_cpu_percent:
+            remaining.append(1.0 - self.cpu_percent / self.max_cpu_percent)
+        if self.max_loop_lag_ms:
+            remaining.append(1.0 - lag_p99_ms / self.max_loop_lag_ms)
+        dsp_depth = self.dsp_queue_depth
+        if self.max_dsp_queue_depth:
+            remaining.append(1.0 - dsp_depth / self.max_dsp_queue_depth)
+        headroom = 0.0 if self.draining else max(0.0, min(remaining))
+        
+        return {
+            "active_calls": active_calls,
+            "max_calls": self.max_calls,
+            "cpu_percent": round(self.cpu_percent, 1),
+            "max_cpu_percent": self.max_cpu_percent,
+            "loop_lag_p99_ms": round(lag_p99_ms, 1),
+            "max_loop_lag_ms": self.max_loop_lag_ms,
+            "dsp_queue_depth": dsp_depth,
+            "max_dsp_queue_depth": self.max_dsp_queue_depth,
+            "headroom": round(headroom, 3),
+            "draining": self.draining,
+            "accepting_calls": headroom > 0.0
+        }
+    
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Report whether this instance should receive new media streams.
+        
+        Uses only in-process state, so a readiness probe never waits on
+        Azure services.
+        
+        Returns:
+            Dictionary with ``ready``, the reasons it is not, and current load
+        """
+        reasons = self.saturation_reasons()
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "active_calls": self.active_calls,
+            "loop_lag_ms": {
+                "p50": round(self.loop_lag_percentile(0.5), 1),
+                "p90": round(self.loop_lag_percentile(0.9), 1),
+                "p99": round(self.loop_lag_percentile(0.99), 1)
+            },
+            "dsp_queue_depth": self.dsp_queue_depth,
+            "headroom": self.headroom()["headroom"]
+        }
+    
+    def start(self) -> None:
+        """Start sampling loop lag and CPU on the running event loop."""
+        if self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(self._monitor())
+    
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._monitor_task = None
+    
+    def _expire_reservations(self) -> None:
+        """Forget admitted calls whose media stream never arrived."""
+        if not self._reservations:
+            return
+        now = time.monotonic()
+        for context_id in [cid for cid, expiry in self._reservations.items() if expiry <= now]:
+            del self._reservations[context_id]
+    
+    async def _monitor(self) -> None:
+        """Probe loop lag every interval and CPU utilization every sample period."""
+        try:
+            cpu_wall = time.monotonic()
+            cpu_time = time.process_time()
+            while True:
+                expected = time.monotonic() + LOOP_LAG_INTERVAL_SECONDS
+                await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+                now = time.monotonic()
+                lag = max(now - expected, 0.0)
+                self._lag_samples.append(lag)
+                LOOP_LAG_SECONDS.observe(lag)
+                
+                if now - cpu_wall >= CPU_SAMPLE_SECONDS:
+                    process_time = time.process_time()
+                    self.cpu_percent = (process_time - cpu_time) / (now - cpu_wall) * 100
+                    cpu_wall, cpu_time = now, process_time
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
+
+
+# Process-wide capacity manager shared by call admission and the media endpoint
+capacity_manager = CapacityManager(
+    settings.max_concurrent_calls,
+    settings.admission_max_cpu_percent,
+    settings.admission_max_loop_lag_ms,
+    settings.admission_max_dsp_queue_depth
+)
+
+HEADROOM = Gauge(
+    "voice_bridge_capacity_headroom", "Remaining fraction of the tightest admission limit",
+    callback=lambda: capacity_manager.headroom()["headroom"]
+)
+CPU_PERCENT = Gauge(
+    "voice_bridge_cpu_percent", "Process CPU utilization over the last sample, in percent of one core",
+    callback=lambda: capacity_manager.cpu_percent
+)
@@ -5,7 +5,11 @@ Uses Azure Managed Identity for authentication
 from pydantic_settings import BaseSettings
 from typing import Optional
 import logging
-from azure.identity import DefaultAzureCredential
+
+from azure.communication.callautomation import AudioFormat
+
+from media_queue import BackpressurePolicy
+from token_provider import AzureTokenProvider
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +24,41 @@ class AppSettings(BaseSettings):
     
     # Azure Communication Services configuration
     acs_connection_string: str
+    acs_audio_format: AudioFormat = AudioFormat.PCM16_K_MONO  # Media streaming format; pcm24KMono matches Voice Live, skipping resampling
+    acs_keepalive_interval_seconds: float = 5.0  # Longest a media WebSocket goes without a send before a connectivity check
     
     # Azure OpenAI Voice Live API configuration
     azure_voice_live_endpoint: str
     voice_live_model: str = "gpt-4o-realtime-preview"
+    voice_live_sample_rate: int = 24000  # PCM rate for input_audio_sampling_rate and audio deltas
+    voice_live_append_window_ms: int = 60  # Coalesce upstream audio into appends of this length (0 = per packet)
+    voice_live_prewarm: bool = True  # Start the Voice Live handshake when the call is answered
+    voice_live_prewarm_ttl_seconds: int = 30  # Close pre-warmed sessions never claimed by a media stream
+    voice_live_url_override: Optional[str] = None  # Dev/test only: connect here without Azure tokens (e.g. a local stub)
+    
+    # DSP offload configuration
+    dsp_workers: int = 0  # Worker processes for resampling; 0 keeps DSP on the event loop
+    
+    # Outbound audio pacing configuration
+    outbound_audio_lead_ms: int = 60  # How far ahead of real time frames are sent to ACS
+    outbound_audio_max_buffer_ms: int = 30000  # Local outbound buffer before the queue policy applies
+    outbound_audio_queue_policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST
+    
+    # Upstream (ACS -> Voice Live) queue configuration
+    upstream_queue_max_packets: int = 50  # 20 ms ACS packets buffered while Voice Live is slow
+    upstream_queue_policy: BackpressurePolicy = BackpressurePolicy.DROP_SILENCE_FIRST
+    
+    # Admission control; a limit of 0 disables that check
+    max_concurrent_calls: int = 0  # Calls this instance takes before refusing new ones
+    admission_max_cpu_percent: float = 85.0  # Process CPU (percent of one core) above which calls are refused
+    admission_max_loop_lag_ms: float = 200.0  # Event loop lag p99 above which calls are refused
+    admission_max_dsp_queue_depth: int = 100  # DSP worker packets in flight above which calls are refused
+    overflow_redirect_target: Optional[str] = None  # Phone number or ACS user id refused calls are redirected to; rejected as busy if unset
+    
+    # Graceful drain for rolling deploys
+    drain_on_sigterm: bool = True  # SIGTERM drains calls before the server exits
+    drain_timeout_seconds: float = 120.0  # Time live calls get to finish before they are hung up
+    admin_api_key: Optional[str] = None  # X-Admin-Key for /admin endpoints; they are disabled if unset
     
     # Azure Managed Identity configuration
     agent_id: str
@@ -33,14 +68,13 @@ class AppSettings(BaseSettings):
     azure_cognitive_services_scope: str = "https://cognitiveservices.azure.com/.default"
     azure_ai_scope: str = "https://ai.azure.com/.default"
     
-    # Token storage (populated at runtime)
-    _cognitive_services_token: Optional[str] = None
-    _azure_ai_token: Optional[str] = None
-    _azure_credential: Optional[DefaultAzureCredential] = None
-    _token_expires_at: Optional[float] = None  # Timestamp when tokens expire
+    # Token cache and background refresh (populated at runtime)
+    _token_provider: Optional[AzureTokenProvider] = None
     
     # Logging configuration
     log_level: str = "INFO"
+    log_rate_limit: int = 10  # DEBUG/INFO records per message template per interval; 0 disables rate limiting
+    log_rate_limit_interval_seconds: float = 1.0
     
     class Config:
         """Pydantic configuration for environment variable loading."""
@@ -54,61 +88,58 @@ class AppSettings(BaseSettings):
         else:
             return f"ws://{self.host}:{self.port}/ws"
     
+    @property
+    def token_provider(self) -> AzureTokenProvider:
+        """Process-wide token provider, created on first use."""
+        if self._token_provider is None:
+            self._token_provider = AzureTokenProvider(
+                self.azure_cognitive_services_scope, self.azure_ai_scope
+            )
+        return self._token_provider
+    
     def get_azure_tokens(self) -> tuple[str, str]:
         """
         Fetch Azure Cognitive Services and AI tokens using DefaultAzureCredential with caching.
         
-        Uses lock-free caching with expiration timestamps for high-concurrency scenarios.
-        Token caching is safe since tokens are service-level, not user-specific.
+        Blocking variant for callers outside the call path. Token caching is
+        safe since tokens are service-level, not user-specific; the cache is
+        shared with the async methods below.
         """
-        import time
-        
-        # Check if we have valid cached tokens (with 5-minute safety buffer)
-        current_time = time.time()
-        if (self._cognitive_services_token and self._azure_ai_token and 
-            self._token_expires_at and current_time < self._token_expires_at):
-            return self._cognitive_services_token, self._azure_ai_token
-        
-        # Cache miss or expired - fetch fresh tokens
-        logger.info("Fetching fresh Azure tokens")
-        
-        if not self._azure_credential:
-            self._azure_credential = DefaultAzureCredential()
-        
-        # Get both tokens for agent authentication
-        cognitive_services_token = self._azure_credential.get_token(self.azure_cognitive_services_scope)
-        azure_ai_token = self._azure_credential.get_token(self.azure_ai_scope)
-        
-        # Cache tokens with 5-minute safety buffer (tokens usually expire in 60 minutes)
-        safety_buffer_seconds = 5 * 60  # 5 minutes
-        expires_in = min(cognitive_services_token.expires_on, azure_ai_token.expires_on)
-        
-        self._cognitive_services_token = cognitive_services_token.token
-        self._azure_ai_token = azure_ai_token.token
-        self._token_expires_at = expires_in - safety_buffer_seconds
-        
-        logger.info("Tokens cached, expires at: %s", time.ctime(self._token_expires_at))
-        return self._cognitive_services_token, self._azure_ai_token
+        return self.token_provider.get_tokens_blocking()
     
     def force_refresh_tokens(self) -> tuple[str, str]:
         """Force refresh of tokens, bypassing cache. Used for 401 retry scenarios."""
         logger.warning("Forcing token refresh due to authentication failure")
-        
-        # Clear cache to force fresh fetch
-        self._cognitive_services_token = None
-        self._azure_ai_token = None
-        self._token_expires_at = None
-        
-        # Fetch fresh tokens
-        return self.get_azure_tokens()
+        self.token_provider.invalidate()
+        return self.token_provider.get_tokens_blocking()
+    
+    async def get_azure_tokens_async(self) -> tuple[str, str]:
+        """Get cached tokens, or fetch them off the event loop with concurrent callers sharing one fetch."""
+        return await self.token_provider.get_tokens()
+    
+    async def force_refresh_tokens_async(self) -> tuple[str, str]:
+        """Force refresh of tokens off the event loop. Used for 401 retry scenarios."""
+        return await self.token_provider.force_refresh()
     
     def get_voice_live_websocket_url(self) -> str:
         """Generate Azure Voice Live WebSocket URL with agent-based authentication."""
+        if self.voice_live_url_override:
+            return self.voice_live_url_override
+        _, ai_token = self.get_azure_tokens()
+        return self._build_voice_live_websocket_url(ai_token)
+    
+    async def get_voice_live_websocket_url_async(self) -> str:
+        """Generate Azure Voice Live WebSocket URL without blocking the event loop."""
+        if self.voice_live_url_override:
+            return self.voice_live_url_override
+        _, ai_token = await self.get_azure_tokens_async()
+        return self._build_voice_live_websocket_url(ai_token)
+    
+    def _build_voice_live_websocket_url(self, ai_token: str) -> str:
+        """Build the Voice Live agent WebSocket URL for an Azure AI token."""
         base_url = self.azure_voice_live_endpoint.replace("https://", "wss://").rstrip("/")
         
         # Always use Azure Managed Identity token-based authentication with agent
-        _, ai_token = self.get_azure_tokens()
-        
         return (f"{base_url}/voice-agent/realtime"
                 f"?api-version=2025-05-01-preview"
                 f"&agent_id={self.agent_id}"
@@ -117,8 +148,22 @@ class AppSettings(BaseSettings):
     
     def get_websocket_headers(self, client_request_id: str) -> dict:
         """Get WebSocket connection headers with authentication."""
+        if self.voice_live_url_override:
+            return {"x-ms-client-request-id": client_request_id}
         # Use cognitive services token for Authorization header
         cognitive_token, _ = self.get_azure_tokens()
+        return self._build_websocket_headers(cognitive_token, client_request_id)
+    
+    async def get_websocket_headers_async(self, client_request_id: str) -> dict:
+        """Get WebSocket connection headers without blocking the event loop."""
+        if self.voice_live_url_override:
+            return {"x-ms-client-request-id": client_request_id}
+        cognitive_token, _ = await self.get_azure_tokens_async()
+        return self._build_websocket_headers(cognitive_token, client_request_id)
+    
+    @staticmethod
+    def _build_websocket_headers(cognitive_token: str, client_request_id: str) -> dict:
+        """Build Voice Live WebSocket headers for a Cognitive Services token."""
         return {
             "Authorization": f"Bearer {cognitive_token}",
             "x-ms-client-request-id": client_request_id
@@ -0,0 +1,185 @@
+"""
+Graceful drain for rolling deploys.
+Stops taking calls, lets live calls finish up to a deadline, then hangs up
+and closes what is left, before the server is allowed to exit.
+"""
+import asyncio
+import logging
+import signal
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from call_registry import call_registry
+from capacity import capacity_manager
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# How often the drain checks whether the remaining calls have ended
+DRAIN_POLL_SECONDS = 1.0
+
+
+class DrainController:
+    """
+    Process-wide drain state machine.
+    
+    ``start`` flips the capacity manager into draining, so ``/ready``
+    returns 503 and new incoming calls are refused, then waits for the
+    active calls to end on their own. Calls still up at the deadline are
+    hung up (when ``hang_up`` is set and the call connection id is known)
+    and their media handlers closed.
+    
+    ``install_signal_handler`` wraps the current SIGTERM handler (uvicorn's,
+    when run under uvicorn): the first SIGTERM starts a drain and the
+    wrapped handler only runs once it completes, so the server stops after
+    the calls rather than in the middle of them. A second SIGTERM skips the
+    wait.
+    """
+    
+    def __init__(self, timeout_seconds: float = 120.0):
+        """
+        Initialize drain controller.
+        
+        Args:
+            timeout_seconds: Default time live calls are given to finish
+        """
+        self.timeout_seconds = timeout_seconds
+        self.hang_up: Optional[Callable[[str], Awaitable[None]]] = None
+        self.deadline: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.calls_closed = 0
+        self._task: Optional[asyncio.Task] = None
+        self._previous_handler: Any = None
+        self._signal_installed = False
+        self._sigterm_received = False
+        self._exited = False
+    
+    @property
+    def draining(self) -> bool:
+        return capacity_manager.draining
+    
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+    
+    def start(self, timeout_seconds: Optional[float] = None) -> asyncio.Task:
+        """
+        Start draining, or return the drain already in progress.
+        
+        Args:
+            timeout_seconds: Time live calls are given to finish (default: ``timeout_seconds``)
+        
+        Returns:
+            Task that completes once every call has ended or been closed
+        """
+        if self._task is None:
+            timeout = self.timeout_seconds if timeout_seconds is None else timeout_seconds
+            capacity_manager.draining = True
+            self.started_at = time.monotonic()
+            self.deadline = self.started_at + timeout
+            logger.warning("Draining: refusing new calls; %d active call(s) have %.0f s to finish",
+                           capacity_manager.active_calls, timeout)
+            self._task = asyncio.create_task(self._drain())
+        return self._task
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Report drain progress.
+        
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        now = time.monotonic()
+        return {
+            "draining": self.draining,
+            "done": self.done,
+            "active_calls": capacity_manager.active_calls,
+            "elapsed_seconds": round(now - self.started_at, 1) if self.started_at is not None else None,
+            "deadline_in_seconds": round(max(self.deadline - now, 0.0), 1) if self.deadline is not None else None,
+            "calls_closed": self.calls_closed
+        }
+    
+    async def _drain(self) -> None:
+        """Wait for calls to end, then close the ones still up at the deadline."""
+        try:
+            while capacity_manager.active_calls and time.monotonic() < self.deadline:
+                await asyncio.sleep(min(DRAIN_POLL_SECONDS, max(self.deadline - time.monotonic(), 0.0)))
+            
+            handlers = list(capacity_manager.active_handlers)
+            if handlers:
+                logger.warning("Drain deadline reached - closing %d call(s)", len(handlers))
+                streaming = [call for call in call_registry.calls() if call.media_handler is not None]
+                await asyncio.gather(*(self._hang_up(call.call_connection_id) for call in streaming))
+                await asyncio.gather(*(handler.close() for handler in handlers), return_exceptions=True)
+                self.calls_closed = len(handlers)
+            logger.warning("Drain complete after %.1f s", time.monotonic() - self.started_at)
+        except asyncio.CancelledError:
+            pass  # Application shut down before the drain finished
+    
+    async def _hang_up(self, call_connection_id: Optional[str]) -> None:
+        """End a call for the caller too, so they hear a hang-up rather than silence."""
+        if self.hang_up is None or not call_connection_id:
+            return
+        try:
+            await self.hang_up(call_connection_id)
+        except Exception as e:
+            logger.warning("Failed to hang up call %s during drain: %s", call_connection_id, e)
+    
+    async def stop(self) -> None:
+        """Cancel a drain still running at application shutdown and restore SIGTERM."""
+        self.restore_signal_handler()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+    
+    def install_signal_handler(self) -> None:
+        """
+        Drain on SIGTERM before the previously installed handler runs.
+        
+        Signal handlers can only be set from the main thread; elsewhere
+        (e.g. under a test client) this does nothing.
+        """
+        if self._signal_installed or threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        self._previous_handler = signal.getsignal(signal.SIGTERM)
+        if self._previous_handler is None:
+            self._previous_handler = signal.SIG_DFL  # Installed outside Python
+        
+        def on_sigterm(signum: int, frame: Any) -> None:
+            if self._sigterm_received:
+                logger.warning("Second SIGTERM - shutting down without waiting for calls")
+                self._exit(signum, frame)
+                return
+            self._sigterm_received = True
+            loop.call_soon_threadsafe(self._drain_then_exit, signum, frame)
+        
+        signal.signal(signal.SIGTERM, on_sigterm)
+        self._signal_installed = True
+    
+    def restore_signal_handler(self) -> None:
+        """Put back the SIGTERM handler that was wrapped."""
+        if self._signal_installed:
+            signal.signal(signal.SIGTERM, self._previous_handler)
+            self._signal_installed = False
+    
+    def _drain_then_exit(self, signum: int, frame: Any) -> None:
+        """Start draining on the event loop and hand the signal on when done."""
+        self.start().add_done_callback(lambda _task: self._exit(signum, frame))
+    
+    def _exit(self, signum: int, frame: Any) -> None:
+        """Run the wrapped SIGTERM handler (uvicorn's exit), or the default action."""
+        if self._exited:
+            return
+        self._exited = True
+        previous = self._previous_handler
+        self.restore_signal_handler()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            signal.raise_signal(signum)
+
+
+# Process-wide drain controller, started by SIGTERM or POST /admin/drain
+drain_controller = DrainController(settings.drain_timeout_seconds)
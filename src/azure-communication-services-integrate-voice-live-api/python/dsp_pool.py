@@ -0,0 +1,461 @@
+"""
+Optional process pool for audio DSP offload.
+Moves per-packet resampling off the uvicorn event loop for high call density.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Dict, List, Optional, Tuple, Union
+
+from audio_resampler import StreamingResampler, get_resampler
+from metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Request/response opcodes exchanged with worker processes
+_OP_OPEN = 0
+_OP_PROCESS = 1
+_OP_CLOSE = 2
+_OP_STOP = 3
+
+# Workers answer each request with (request_id, payload): the output length
+# when the result is in the ring slot, the output bytes when it did not fit,
+# or an error message when processing failed
+
+
+class SharedMemoryRing:
+    """
+    Fixed-slot ring buffer in shared memory.
+    
+    Each worker owns one ring with an input half and an output half. Slot
+    ``n`` of the input half carries a packet to the worker and slot ``n`` of
+    the output half carries the processed packet back, so only small
+    descriptors travel over the pipes and audio is never pickled.
+    """
+    
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        """
+        Create or attach to a shared memory ring.
+        
+        Args:
+            slots: Number of slots in each half
+            slot_bytes: Size of an input slot; output slots are 4x larger
+                to fit upsampled audio
+            name: Existing shared memory block to attach to, or None to create one
+        """
+        self.slots = slots
+        self.in_slot_bytes = slot_bytes
+        self.out_slot_bytes = slot_bytes * 4
+        self._out_base = slots * self.in_slot_bytes
+        size = self._out_base + slots * self.out_slot_bytes
+        
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+    
+    def write_input(self, slot: int, data: bytes) -> None:
+        """Copy a packet into an input slot."""
+        start = slot * self.in_slot_bytes
+        self.shm.buf[start:start + len(data)] = data
+    
+    def read_input(self, slot: int, length: int) -> bytes:
+        """Copy a packet out of an input slot."""
+        start = slot * self.in_slot_bytes
+        return bytes(self.shm.buf[start:start + length])
+    
+    def write_output(self, slot: int, data: bytes) -> None:
+        """Copy a processed packet into an output slot."""
+        start = self._out_base + slot * self.out_slot_bytes
+        self.shm.buf[start:start + len(data)] = data
+    
+    def read_output(self, slot: int, length: int) -> bytes:
+        """Copy a processed packet out of an output slot."""
+        start = self._out_base + slot * self.out_slot_bytes
+        return bytes(self.shm.buf[start:start + length])
+    
+    def close(self, unlink: bool = False) -> None:
+        """Detach from the shared memory block, optionally destroying it."""
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker_main(requests: Connection, responses: Connection, ring_name: str, slots: int, slot_bytes: int) -> None:
+    """
+    Worker process entry point.
+    
+    Requests are handled strictly in arrival order, and every stream lives on
+    exactly one worker, so per-call packet ordering and filter state are
+    preserved without any locking. A request that fails is answered with an
+    error message so the worker keeps serving its other streams.
+    """
+    ring = SharedMemoryRing(slots, slot_bytes, name=ring_name)
+    resamplers: Dict[int, StreamingResampler] = {}
+    
+    try:
+        while True:
+            message = requests.recv()
+            op = message[0]
+            if op == _OP_STOP:
+                break
+            
+            try:
+                if op == _OP_PROCESS:
+                    _, request_id, stream_id, slot, payload = message
+                    data = ring.read_input(slot, payload) if isinstance(payload, int) else payload
+                    output = resamplers[stream_id].resample(data)
+                    if len(output) <= ring.out_slot_bytes:
+                        ring.write_output(slot, output)
+                        responses.send((request_id, len(output)))
+                    else:
+                        responses.send((request_id, output))
+                elif op == _OP_OPEN:
+                    _, stream_id, in_rate, out_rate, channels = message
+                    resamplers[stream_id] = get_resampler(in_rate, out_rate, channels)
+                elif op == _OP_CLOSE:
+                    resamplers.pop(message[1], None)
+            except (EOFError, OSError):
+                raise
+            except Exception as e:
+                # A failed open surfaces on the stream's first packet instead
+                if op == _OP_PROCESS:
+                    responses.send((message[1], f"{type(e).__name__}: {e}"))
+    except (EOFError, OSError, KeyboardInterrupt):
+        pass  # Parent went away or interrupted - exit quietly
+    finally:
+        ring.close()
+
+
+class _Worker:
+    """Parent-side handle for one DSP worker process."""
+    
+    def __init__(self, context, slots: int, slot_bytes: int):
+        self.ring = SharedMemoryRing(slots, slot_bytes)
+        self.free_slots: List[int] = list(range(slots))
+        self.slot_available = asyncio.Semaphore(slots)
+        self.streams = 0
+        self.failed = False
+        
+        worker_requests, self.requests = context.Pipe(duplex=False)
+        self.responses, worker_responses = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=_worker_main,
+            args=(worker_requests, worker_responses, self.ring.name, slots, slot_bytes),
+            daemon=True
+        )
+        self.process.start()
+        worker_requests.close()
+        worker_responses.close()
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of packets currently being processed by this worker."""
+        return self.ring.slots - len(self.free_slots)
+    
+    @property
+    def healthy(self) -> bool:
+        """Whether the worker process is running and its pipes are open."""
+        return not self.failed and self.process.is_alive()
+
+
+class DSPWorkerPool:
+    """
+    Process pool that resamples per-call audio off the event loop.
+    
+    Streams are pinned to a worker when opened, audio crosses the process
+    boundary through shared-memory rings, and a single reader thread turns
+    worker responses back into event loop futures. A worker that dies is
+    not replaced: new streams go to the remaining workers, or run inline on
+    the event loop once none is left, and streams pinned to it switch to
+    inline resampling.
+    """
+    
+    def __init__(self, workers: int, slots: int = 64, slot_bytes: int = 16384):
+        """
+        Initialize DSP worker pool.
+        
+        Args:
+            workers: Number of worker processes
+            slots: In-flight packets allowed per worker
+            slot_bytes: Largest input packet carried through shared memory;
+                larger packets are sent inline over the pipe
+        """
+        self.worker_count = workers
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._workers: List[_Worker] = []
+        self._pending: Dict[int, Tuple[asyncio.Future, _Worker, int]] = {}
+        self._request_ids = itertools.count()
+        self._stream_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = False
+    
+    @property
+    def queue_depth(self) -> int:
+        """Total packets in flight across all workers."""
+        return sum(worker.in_flight for worker in self._workers)
+    
+    def start(self) -> None:
+        """Start worker processes and the response reader thread."""
+        self._loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(context, self.slots, self.slot_bytes) for _ in range(self.worker_count)]
+        self._reader = threading.Thread(target=self._read_responses, name="dsp-pool-reader", daemon=True)
+        self._reader.start()
+        logger.info("DSP worker pool started with %d worker(s)", self.worker_count)
+    
+    async def stop(self) -> None:
+        """Stop workers, fail outstanding requests and release shared memory."""
+        self._stopping = True
+        for worker in self._workers:
+            try:
+                worker.requests.send((_OP_STOP,))
+            except (OSError, ValueError):
+                pass
+        
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._reader:
+            await asyncio.to_thread(self._reader.join, 5)
+        
+        for future, _, _ in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("DSP worker pool stopped"))
+        self._pending.clear()
+        
+        for worker in self._workers:
+            worker.requests.close()
+            worker.responses.close()
+            worker.ring.close(unlink=True)
+        self._workers = []
+        logger.info("DSP worker pool stopped")
+    
+    def open_stream(
+        self, in_rate: int, out_rate: int, channels: int = 1
+    ) -> Union["PooledResamplerStream", "InlineResamplerStream"]:
+        """
+        Open a resampling stream pinned to the least-loaded healthy worker.
+        
+        Args:
+            in_rate: Input sample rate in Hz
+            out_rate: Output sample rate in Hz
+            channels: Number of interleaved channels
+        
+        Returns:
+            Stream whose ``resample`` runs in a worker process, or inline
+            when no worker is healthy
+        """
+        for worker in sorted((w for w in self._workers if w.healthy), key=lambda w: w.streams):
+            stream_id = next(self._stream_ids)
+            try:
+                worker.requests.send((_OP_OPEN, stream_id, in_rate, out_rate, channels))
+            except (OSError, ValueError):
+                worker.failed = True
+                continue
+            worker.streams += 1
+            return PooledResamplerStream(self, worker, stream_id, in_rate, out_rate, channels)
+        
+        logger.warning("No healthy DSP worker - resampling %d -> %d Hz on the event loop", in_rate, out_rate)
+        return InlineResamplerStream(in_rate, out_rate, channels)
+    
+    def _close_stream(self, worker: _Worker, stream_id: int) -> None:
+        """Release a stream's state in its worker."""
+        worker.streams -= 1
+        if not self._stopping:
+            try:
+                worker.requests.send((_OP_CLOSE, stream_id))
+            except (OSError, ValueError):
+                pass
+    
+    async def _process(self, worker: _Worker, stream_id: int, data: bytes) -> bytes:
+        """Send one packet to a worker and await the processed result."""
+        await worker.slot_available.acquire()
+        if worker.failed:
+            worker.slot_available.release()
+            raise ConnectionError("DSP worker exited unexpectedly")
+        slot = worker.free_slots.pop()
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = (future, worker, slot)
+        
+        if len(data) <= self.slot_bytes:
+            worker.ring.write_input(slot, data)
+            payload: Union[int, bytes] = len(data)
+        else:
+            payload = data
+        
+        try:
+            worker.requests.send((_OP_PROCESS, request_id, stream_id, slot, payload))
+        except (OSError, ValueError) as e:
+            self._release(request_id)
+            worker.failed = True
+            raise ConnectionError("DSP worker is not accepting requests") from e
+        return await future
+    
+    def _release(self, request_id: int) -> Optional[Tuple[asyncio.Future, _Worker, int]]:
+        """Return a request's slot to its worker."""
+        entry = self._pending.pop(request_id, None)
+        if entry:
+            _, worker, slot = entry
+            worker.free_slots.append(slot)
+            worker.slot_available.release()
+        return entry
+    
+    def _complete(self, request_id: int, payload: Union[int, bytes]) -> None:
+        """Resolve a request future on the event loop thread."""
+        entry = self._pending.get(request_id)
+        if entry is None:
+            return
+        future, worker, slot = entry
+        if isinstance(payload, str):
+            self._release(request_id)
+            if not future.done():
+                future.set_exception(RuntimeError(f"DSP worker failed to resample: {payload}"))
+            return
+        result = worker.ring.read_output(slot, payload) if isinstance(payload, int) else payload
+        self._release(request_id)
+        if not future.done():
+            future.set_result(result)
+    
+    def _fail_worker(self, worker: _Worker) -> None:
+        """Fail every request still waiting on a worker that has died."""
+        worker.failed = True
+        for request_id, (future, owner, _) in list(self._pending.items()):
+            if owner is worker:
+                self._release(request_id)
+                if not future.done():
+                    future.set_exception(ConnectionError("DSP worker exited unexpectedly"))
+    
+    def _read_responses(self) -> None:
+        """Reader thread: forward worker responses to the event loop."""
+        connections = {worker.responses: worker for worker in self._workers}
+        while connections and not self._loop.is_closed():
+            for connection in wait(list(connections)):
+                try:
+                    request_id, payload = connection.recv()
+                except (EOFError, OSError):
+                    worker = connections.pop(connection)
+                    if not self._stopping:
+                        logger.error("DSP worker exited unexpectedly")
+                        self._loop.call_soon_threadsafe(self._fail_worker, worker)
+                    continue
+                self._loop.call_soon_threadsafe(self._complete, request_id, payload)
+
+
+class PooledResamplerStream:
+    """Per-call resampling stream executed by a DSP worker process."""
+    
+    def __init__(self, pool: DSPWorkerPool, worker: _Worker, stream_id: int, in_rate: int, out_rate: int, channels: int = 1):
+        self._pool = pool
+        self._worker = worker
+        self._stream_id = stream_id
+        self._format = (in_rate, out_rate, channels)
+        self._inline: Optional[InlineResamplerStream] = None
+        self._closed = False
+    
+    async def resample(self, audio: bytes) -> bytes:
+        """
+        Resample 16-bit PCM in the worker, preserving per-stream order.
+        
+        If the worker dies, the stream carries on inline on the event loop.
+        """
+        if not audio:
+            return b""
+        if self._inline is not None:
+            return await self._inline.resample(audio)
+        try:
+            return await self._pool._process(self._worker, self._stream_id, audio)
+        except ConnectionError:
+            if self._worker.healthy or self._closed:
+                raise
+            logger.warning("DSP worker lost - resampling stream %d on the event loop", self._stream_id)
+            self.close()
+            self._inline = InlineResamplerStream(*self._format)
+            return await self._inline.resample(audio)
+    
+    def close(self) -> None:
+        """Release the stream's worker-side filter state."""
+        if not self._closed:
+            self._closed = True
+            self._pool._close_stream(self._worker, self._stream_id)
+
+
+class InlineResamplerStream:
+    """Per-call resampling stream executed on the event loop."""
+    
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1):
+        self._resampler = get_resampler(in_rate, out_rate, channels)
+    
+    async def resample(self, audio: bytes) -> bytes:
+        """Resample 16-bit PCM inline."""
+        return self._resampler.resample(audio)
+    
+    def close(self) -> None:
+        """Nothing to release for inline streams."""
+
+
+# Process-wide pool, created at startup when DSP_WORKERS > 0
+_pool: Optional[DSPWorkerPool] = None
+
+DSP_QUEUE_DEPTH = Gauge(
+    "voice_bridge_queue_depth", "Packets queued across active calls", {"queue": "dsp"},
+    callback=lambda: _pool.queue_depth if _pool is not None else 0
+)
+
+
+async def start_dsp_pool(workers: int) -> Optional[DSPWorkerPool]:
+    """
+    Start the process-wide DSP worker pool.
+    
+    Args:
+        workers: Number of worker processes; 0 keeps DSP on the event loop
+    
+    Returns:
+        The started pool, or None when offload is disabled
+    """
+    global _pool
+    if workers > 0 and _pool is None:
+        _pool = DSPWorkerPool(workers)
+        _pool.start()
+    return _pool
+
+
+async def stop_dsp_pool() -> None:
+    """Stop the process-wide DSP worker pool if it is running."""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.stop()
+
+
+def get_dsp_pool() -> Optional[DSPWorkerPool]:
+    """Return the running DSP worker pool, if any."""
+    return _pool
+
+
+def open_resampler_stream(
+    in_rate: int, out_rate: int, channels: int = 1
+) -> Union[PooledResamplerStream, InlineResamplerStream]:
+    """
+    Open a per-call resampling stream on the pool when running, else inline.
+    
+    Args:
+        in_rate: Input sample rate in Hz
+        out_rate: Output sample rate in Hz
+        channels: Number of interleaved channels
+    
+    Returns:
+        Stream with an awaitable ``resample`` method
+    """
+    if _pool is not None:
+        return _pool.open_stream(in_rate, out_rate, channels)
+    return InlineResamplerStream(in_rate, out_rate, channels)
@@ -3,9 +3,11 @@ Helper utilities for Azure Communication Services integration.
 Provides event parsing and data extraction functions.
 """
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Union
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -129,17 +131,20 @@ class URLHelper:
         return f"{base}/api/callbacks/{context_id}?callerId={caller_id}"
     
     @staticmethod
-    def create_websocket_url(base_url: str) -> str:
+    def create_websocket_url(base_url: str, context_id: Optional[str] = None) -> str:
         """
         Create WebSocket URL from base URL.
         
         Args:
             base_url: Base application URL
+            context_id: Optional call context identifier, passed as the contextId query parameter
             
         Returns:
             WebSocket URL with appropriate protocol
         """
         ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://")
+        if context_id:
+            return f"{ws_url.rstrip('/')}/ws?contextId={context_id}"
         return f"{ws_url.rstrip('/')}/ws"
     
     @staticmethod
@@ -164,13 +169,48 @@ class AudioHelper:
     """Helper class for audio data processing."""
     
     @staticmethod
-    def is_silent_audio(audio_bytes: bytes, threshold: float = 0.01) -> bool:
+    def _pcm16_samples(audio: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+        """View 16-bit PCM data as an int16 array without copying it."""
+        view = memoryview(audio)
+        return np.frombuffer(view, dtype=np.int16, count=view.nbytes // 2)
+    
+    @staticmethod
+    def _pcm16_magnitudes(samples: np.ndarray) -> np.ndarray:
+        """Absolute sample values; the uint16 view keeps abs(-32768) at 32768."""
+        return np.abs(samples).view(np.uint16)
+    
+    @staticmethod
+    def get_audio_levels(audio: Union[bytes, bytearray, memoryview]) -> Tuple[float, float]:
         """
-        Check if audio data represents silence.
+        Measure the energy and peak of 16-bit PCM audio.
+        
+        Args:
+            audio: PCM audio data, 16-bit little-endian
+            
+        Returns:
+            Tuple of (rms, peak), both normalized to the 0.0 - 1.0 range
+        """
+        samples = AudioHelper._pcm16_samples(audio)
+        if samples.size == 0:
+            return 0.0, 0.0
+        
+        as_float = samples.astype(np.float32)
+        rms = float(np.sqrt(np.dot(as_float, as_float) / samples.size)) / 32768.0
+        peak = int(AudioHelper._pcm16_magnitudes(samples).max()) / 32768.0
+        return rms, peak
+    
+    @staticmethod
+    def is_silent_audio(audio_bytes: Union[bytes, bytearray, memoryview], threshold: float = 0.01) -> bool:
+        """
+        Check if 16-bit PCM audio data represents silence.
+        
+        Audio is silent when no sample exceeds the threshold, so a single
+        speech transient keeps the whole packet. The check runs in numpy over
+        a zero-copy view of the packet.
         
         Args:
-            audio_bytes: Audio data as bytes
-            threshold: Silence threshold (0.0 to 1.0)
+            audio_bytes: PCM audio data, 16-bit little-endian
+            threshold: Peak amplitude threshold relative to full scale (0.0 to 1.0)
             
         Returns:
             True if audio is considered silent, False otherwise
@@ -179,9 +219,10 @@ class AudioHelper:
             return True
         
         try:
-            # Simple silence detection - check if all bytes are below threshold
-            max_value = max(audio_bytes) if audio_bytes else 0
-            return max_value < (threshold * 255)
+            samples = AudioHelper._pcm16_samples(audio_bytes)
+            if samples.size == 0:
+                return True
+            return bool(AudioHelper._pcm16_magnitudes(samples).max() < threshold * 32768.0)
         except Exception as e:
             logger.error(f"Error checking audio silence: {e}")
             return True
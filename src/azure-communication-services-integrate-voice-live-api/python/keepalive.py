@@ -0,0 +1,130 @@
+"""
+Process-wide keep-alive scheduling for ACS media WebSockets.
+One task on a coarse timer wheel sends connectivity checks for every call,
+instead of each call running its own sleep loop.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVES_SENT = Counter("voice_bridge_keepalives", "ACS keep-alive checks handled by the scheduler", {"result": "sent"})
+KEEPALIVES_SKIPPED = Counter("voice_bridge_keepalives", "ACS keep-alive checks handled by the scheduler", {"result": "skipped"})
+
+
+class KeepAliveScheduler:
+    """
+    Timer wheel that keeps idle ACS media WebSockets alive.
+    
+    Registered calls sit in one of a ring of slots, ``tick_seconds`` apart.
+    Each tick the scheduler visits only the slot that is due: a call that
+    sent anything to ACS within the last ``interval_seconds`` (e.g. paced
+    response audio) is moved to the slot matching its last send, and every
+    other call gets a keep-alive, sent together with the rest of the slot.
+    A call therefore costs nothing between its checks, however many calls
+    are registered. Each send is given one tick to complete, so a stalled
+    socket cannot hold the wheel back.
+    
+    Calls must expose ``last_sent_at`` (monotonic time of their last send to
+    ACS) and an async ``send_keepalive()``. Everything runs on the event
+    loop thread, so no locking is needed.
+    """
+    
+    def __init__(self, interval_seconds: float = 5.0, tick_seconds: float = 1.0):
+        """
+        Initialize keep-alive scheduler.
+        
+        Args:
+            interval_seconds: Longest a call may go without sending to ACS
+            tick_seconds: Wheel resolution; checks fire up to this late
+        """
+        self.interval_seconds = interval_seconds
+        self.tick_seconds = tick_seconds
+        self._slots: List[Set[Any]] = [set() for _ in range(math.ceil(interval_seconds / tick_seconds) + 1)]
+        self._slot_of: Dict[Any, int] = {}
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._slot_of)
+    
+    def register(self, call: Any) -> None:
+        """Start keeping a call's media WebSocket alive."""
+        if call not in self._slot_of:
+            self._schedule(call, time.monotonic() + self.interval_seconds)
+    
+    def unregister(self, call: Any) -> None:
+        """Stop keep-alives for a call that has ended."""
+        slot = self._slot_of.pop(call, None)
+        if slot is not None:
+            self._slots[slot].discard(call)
+    
+    def start(self) -> None:
+        """Start the wheel on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the wheel."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def _schedule(self, call: Any, due: float) -> None:
+        """Place a call in the slot that fires at or just after ``due``."""
+        ticks = math.ceil((due - time.monotonic()) / self.tick_seconds)
+        ticks = min(max(ticks, 1), len(self._slots) - 1)
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot].add(call)
+        self._slot_of[call] = slot
+    
+    async def _run(self) -> None:
+        """Advance one slot per tick and send the keep-alives that are due."""
+        try:
+            while True:
+                await asyncio.sleep(self.tick_seconds)
+                self._cursor = (self._cursor + 1) % len(self._slots)
+                due = self._slots[self._cursor]
+                if not due:
+                    continue
+                self._slots[self._cursor] = set()
+                
+                now = time.monotonic()
+                idle = []
+                for call in due:
+                    last_sent_at = call.last_sent_at
+                    if now - last_sent_at < self.interval_seconds:
+                        KEEPALIVES_SKIPPED.inc()
+                        self._schedule(call, last_sent_at + self.interval_seconds)
+                    else:
+                        idle.append(call)
+                        self._schedule(call, now + self.interval_seconds)
+                
+                if idle:
+                    KEEPALIVES_SENT.inc(len(idle))
+                    # One slow socket must not hold up the rest of the slot, or the next tick
+                    results = await asyncio.gather(
+                        *(asyncio.wait_for(call.send_keepalive(), self.tick_seconds) for call in idle),
+                        return_exceptions=True
+                    )
+                    for result in results:
+                        if isinstance(result, asyncio.TimeoutError):
+                            logger.warning("Keep-alive send timed out after %.1f s", self.tick_seconds)
+                        elif isinstance(result, Exception):
+                            logger.warning("Failed to send keep-alive: %s", result)
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
+
+
+# Process-wide scheduler shared by all ACS media handlers
+keepalive_scheduler = KeepAliveScheduler(settings.acs_keepalive_interval_seconds)
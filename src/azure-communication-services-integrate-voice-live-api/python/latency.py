@@ -0,0 +1,140 @@
+"""
+Per-call latency timeline for the ACS <-> Voice Live bridge.
+Records monotonic marks along each conversational turn and aggregates them
+into process-wide turn-latency histograms.
+"""
+import logging
+import time
+from typing import Optional
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# ACS frame arrival -> input_audio_buffer.append carrying it (local upstream pipeline)
+UPSTREAM_APPEND_SECONDS = Histogram(
+    "voice_bridge_upstream_append_seconds",
+    "Time from an ACS audio frame arriving to the Voice Live append that carries it"
+)
+# Last append before end of speech -> speech_stopped (VAD silence window plus network)
+SPEECH_STOPPED_SECONDS = Histogram(
+    "voice_bridge_speech_stopped_seconds",
+    "Time from the last audio append to Voice Live reporting speech_stopped"
+)
+# speech_stopped -> first response.audio.delta (model response time)
+FIRST_DELTA_SECONDS = Histogram(
+    "voice_bridge_first_delta_seconds",
+    "Time from speech_stopped to the first response audio delta"
+)
+# First response.audio.delta -> first outbound frame sent to ACS (local downstream pipeline)
+FIRST_FRAME_SECONDS = Histogram(
+    "voice_bridge_first_frame_seconds",
+    "Time from the first response audio delta to the first outbound frame sent to ACS"
+)
+# speech_stopped -> first outbound frame sent to ACS (end-of-turn to start of reply)
+TURN_LATENCY_SECONDS = Histogram(
+    "voice_bridge_turn_latency_seconds",
+    "Time from speech_stopped to the first outbound frame of the reply sent to ACS"
+)
+
+# speech_started -> StopAudio sent to ACS (how long the caller talks over the reply)
+BARGE_IN_SECONDS = Histogram(
+    "voice_bridge_barge_in_seconds",
+    "Time from Voice Live reporting speech_started to StopAudio being sent to ACS",
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+TURN_HISTOGRAMS = (
+    UPSTREAM_APPEND_SECONDS,
+    SPEECH_STOPPED_SECONDS,
+    FIRST_DELTA_SECONDS,
+    FIRST_FRAME_SECONDS,
+    TURN_LATENCY_SECONDS,
+    BARGE_IN_SECONDS
+)
+
+
+class CallTimeline:
+    """
+    Monotonic latency marks for one call.
+    
+    A turn starts when Voice Live reports ``speech_stopped`` and ends when
+    the first frame of the reply is sent to ACS. Marks that arrive outside a
+    turn (e.g. audio deltas of a greeting) are ignored, and a barge-in
+    abandons the turn in progress and is itself timed until StopAudio
+    reaches ACS.
+    """
+    __slots__ = ("last_append_at", "speech_stopped_at", "first_delta_at", "barge_in_at", "turns")
+    
+    def __init__(self):
+        self.last_append_at: Optional[float] = None
+        self.speech_stopped_at: Optional[float] = None
+        self.first_delta_at: Optional[float] = None
+        self.barge_in_at: Optional[float] = None
+        self.turns = 0
+    
+    def mark_append(self, frame_arrived_at: Optional[float]) -> None:
+        """
+        Record an input_audio_buffer.append being queued for Voice Live.
+        
+        Args:
+            frame_arrived_at: Monotonic arrival time of the oldest ACS frame in the append
+        """
+        now = time.monotonic()
+        if frame_arrived_at is not None:
+            UPSTREAM_APPEND_SECONDS.observe(now - frame_arrived_at)
+        self.last_append_at = now
+    
+    def mark_speech_stopped(self) -> None:
+        """Record input_audio_buffer.speech_stopped and start a new turn."""
+        now = time.monotonic()
+        if self.last_append_at is not None:
+            SPEECH_STOPPED_SECONDS.observe(now - self.last_append_at)
+        self.speech_stopped_at = now
+        self.first_delta_at = None
+    
+    def mark_audio_delta(self) -> None:
+        """Record a response.audio.delta; only the first of a turn is timed."""
+        if self.speech_stopped_at is None or self.first_delta_at is not None:
+            return
+        self.first_delta_at = time.monotonic()
+        FIRST_DELTA_SECONDS.observe(self.first_delta_at - self.speech_stopped_at)
+    
+    def mark_outbound_frame(self) -> None:
+        """Record an outbound frame sent to ACS; the first after a delta ends the turn."""
+        if self.first_delta_at is None or self.speech_stopped_at is None:
+            return
+        now = time.monotonic()
+        FIRST_FRAME_SECONDS.observe(now - self.first_delta_at)
+        TURN_LATENCY_SECONDS.observe(now - self.speech_stopped_at)
+        self.turns += 1
+        logger.info("Turn %d latency: %.0f ms (model %.0f ms, downstream %.0f ms)",
+                    self.turns,
+                    (now - self.speech_stopped_at) * 1000,
+                    (self.first_delta_at - self.speech_stopped_at) * 1000,
+                    (now - self.first_delta_at) * 1000)
+        self.speech_stopped_at = None
+        self.first_delta_at = None
+    
+    def mark_barge_in(self) -> None:
+        """Abandon the turn in progress when the caller starts speaking again."""
+        self.speech_stopped_at = None
+        self.first_delta_at = None
+        self.barge_in_at = time.monotonic()
+    
+    def mark_stop_sent(self) -> None:
+        """Record StopAudio being sent to ACS; times the barge-in that caused it."""
+        if self.barge_in_at is None:
+            return
+        BARGE_IN_SECONDS.observe(time.monotonic() - self.barge_in_at)
+        self.barge_in_at = None
+
+
+def get_turn_latency_summary() -> dict:
+    """
+    Summarize the process-wide turn-latency histograms.
+    
+    Returns:
+        Dictionary of histogram name to count, mean and approximate percentiles
+    """
+    return {histogram.name: histogram.summary() for histogram in TURN_HISTOGRAMS}
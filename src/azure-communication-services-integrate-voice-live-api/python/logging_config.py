@@ -0,0 +1,128 @@
+"""
+Logging setup for the voice service.
+Moves log formatting and I/O off the event loop and rate-limits repeated
+messages so a noisy hot path cannot flood the log or stall call audio.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Dict, Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Pass at most ``limit`` records per key in each ``interval_seconds`` window.
+    
+    The key is ``extra={"rate_key": ...}`` when given, otherwise the logger
+    name and the unformatted message template, so lazily formatted calls
+    (``logger.info("x %s", value)``) share one budget however their
+    arguments vary. The first record let through after a suppressed run is
+    annotated with the number of records dropped.
+    
+    Only DEBUG and INFO records are limited; warnings and errors always
+    pass, so a repeated failure is never hidden.
+    """
+    
+    def __init__(self, limit: int = 10, interval_seconds: float = 1.0):
+        """
+        Initialize rate limit filter.
+        
+        Args:
+            limit: Records allowed per key and window (0 disables limiting)
+            interval_seconds: Window length
+        """
+        super().__init__()
+        self.limit = limit
+        self.interval_seconds = interval_seconds
+        self._windows: Dict[Tuple, list] = {}  # key -> [window start, passed, suppressed]
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.limit or record.levelno >= logging.WARNING:
+            return True
+        key = getattr(record, "rate_key", None) or (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval_seconds:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = "%s (%d similar messages suppressed)" % (record.msg, suppressed)
+            if len(self._windows) > 10000:
+                self._prune(now)
+            return True
+        if window[1] < self.limit:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+    
+    def _prune(self, now: float) -> None:
+        """Forget keys whose window has closed with nothing suppressed."""
+        for key in [key for key, window in self._windows.items()
+                    if now - window[0] >= self.interval_seconds and not window[2]]:
+            del self._windows[key]
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+    
+    The stock ``prepare`` formats the message on the calling thread so the
+    record can be pickled; the queue here never leaves the process, so the
+    record is passed through untouched.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = "INFO", rate_limit: int = 10, rate_limit_interval_seconds: float = 1.0) -> None:
+    """
+    Route all logging through a queue drained by a background thread.
+    
+    Replaces any handlers already on the root logger (e.g. from
+    ``basicConfig``). Safe to call more than once; only the first call
+    installs the listener.
+    
+    Args:
+        level: Root log level name
+        rate_limit: Records per message per window (0 disables limiting)
+        rate_limit_interval_seconds: Rate limit window length
+    """
+    global _listener
+    
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper()))
+    if _listener is not None:
+        return
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate_limit, rate_limit_interval_seconds))
+    
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -2,34 +2,46 @@
 Main FastAPI application for Azure Communication Services with Voice Live API integration.
 Handles WebSocket connections for real-time media streaming and AI voice interactions.
 """
+import asyncio
 import json
 import logging
+import secrets
+import time
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 import uvicorn
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, HTTPException, Query
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, HTTPException, Query, Header
+from fastapi.responses import JSONResponse
 from websockets.exceptions import ConnectionClosed
 from azure.communication.callautomation import (
-    CallAutomationClient,
     MediaStreamingOptions,
     MediaStreamingAudioChannelType,
     MediaStreamingContentType,
     StreamingTransportType,
-    AudioFormat
+    CallRejectReason,
+    CommunicationIdentifier,
+    CommunicationUserIdentifier,
+    PhoneNumberIdentifier
 )
+from azure.communication.callautomation.aio import CallAutomationClient
 
 from config import settings
 from helpers import ACSHelper, URLHelper
 from acs_media_handler import ACSMediaStreamingHandler
+from capacity import capacity_manager, REJECTED_CALLS, REDIRECTED_CALLS
+from keepalive import keepalive_scheduler
+from call_registry import call_registry
+from drain import drain_controller
+from dsp_pool import start_dsp_pool, stop_dsp_pool
+from logging_config import configure_logging
+from metrics import REGISTRY, OPENMETRICS_CONTENT_TYPE, Histogram
+from voice_live_pool import voice_live_pool
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.log_level.upper()),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging; records are formatted and written by a background thread
+configure_logging(settings.log_level, settings.log_rate_limit, settings.log_rate_limit_interval_seconds)
 logger = logging.getLogger(__name__)
 
 # Reduce Azure SDK logging verbosity
@@ -52,22 +64,47 @@ async def lifespan(_app: FastAPI):
     # Startup
     logger.info("Azure Communication Services Voice Live API service started")
     
-    # Pre-warm token cache to reduce first call latency
-    try:
-        logger.info("Pre-warming Azure token cache...")
-        import time
-        start_time = time.time()
-        settings.get_azure_tokens()  # This will cache the tokens
-        end_time = time.time()
-        logger.info("Token cache pre-warmed in %.1f seconds", end_time - start_time)
-    except (ImportError, AttributeError, ValueError) as e:
-        logger.warning("Failed to pre-warm token cache: %s", e)
-        logger.warning("Tokens will be fetched on first call (may cause delay)")
+    # Pre-warm token cache to reduce first call latency, then keep it fresh in the background
+    if settings.voice_live_url_override:
+        logger.warning("VOICE_LIVE_URL_OVERRIDE is set - connecting to %s without Azure tokens",
+                       settings.voice_live_url_override)
+    else:
+        try:
+            logger.info("Pre-warming Azure token cache...")
+            import time
+            start_time = time.time()
+            await settings.token_provider.start()
+            end_time = time.time()
+            logger.info("Token cache pre-warmed in %.1f seconds", end_time - start_time)
+        except (ImportError, AttributeError, ValueError) as e:
+            logger.warning("Failed to pre-warm token cache: %s", e)
+            logger.warning("Tokens will be fetched on first call (may cause delay)")
+    
+    # Optional DSP worker pool keeps resampling off the event loop
+    await start_dsp_pool(settings.dsp_workers)
+    
+    # Sample CPU and event loop lag for admission control
+    capacity_manager.start()
+    
+    # One timer wheel sends keep-alives for every idle call
+    keepalive_scheduler.start()
+    
+    # Rolling deploys: SIGTERM drains live calls before uvicorn's own handler runs
+    drain_controller.hang_up = _hang_up_call
+    if settings.drain_on_sigterm:
+        drain_controller.install_signal_handler()
     
     yield
     
     # Shutdown
     logger.info("Azure Communication Services Voice Live API service shutting down")
+    await drain_controller.stop()
+    await capacity_manager.stop()
+    await keepalive_scheduler.stop()
+    await voice_live_pool.close_all()
+    await settings.token_provider.stop()
+    await call_automation_client.close()
+    await stop_dsp_pool()
 
 
 # FastAPI application instance
@@ -106,6 +143,67 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Metrics endpoint in OpenMetrics text format for Prometheus-compatible scrapers."""
+    return Response(content=REGISTRY.render(), media_type=OPENMETRICS_CONTENT_TYPE)
+
+
+@app.get("/capacity")
+async def capacity():
+    """Current load against the admission limits, for load balancers and autoscalers."""
+    return capacity_manager.headroom()
+
+
+@app.get("/calls")
+async def list_calls():
+    """Live calls with their correlation ids, state and setup timings."""
+    calls = call_registry.list_calls()
+    return {"count": len(calls), "calls": calls}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe for least-loaded routing.
+    Returns 503 while any admission limit is reached; never calls Azure services.
+    """
+    readiness = capacity_manager.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
+def _require_admin(admin_key: Optional[str]) -> None:
+    """Admin endpoints are disabled without ADMIN_API_KEY and need it in X-Admin-Key."""
+    if not settings.admin_api_key:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_key or not secrets.compare_digest(admin_key, settings.admin_api_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+@app.post("/admin/drain")
+async def start_drain(
+    timeout_seconds: Optional[float] = Query(None, ge=0),
+    x_admin_key: Optional[str] = Header(None)
+):
+    """
+    Put the instance into drain mode ahead of a deploy.
+    
+    Reports not-ready and refuses new calls from now on; live calls get
+    ``timeout_seconds`` (default DRAIN_TIMEOUT_SECONDS) to finish before
+    they are hung up. Repeated calls return the drain already in progress.
+    """
+    _require_admin(x_admin_key)
+    drain_controller.start(timeout_seconds)
+    return JSONResponse(drain_controller.status(), status_code=202)
+
+
+@app.get("/admin/drain")
+async def drain_status(x_admin_key: Optional[str] = Header(None)):
+    """Drain progress: whether draining, calls left and time to the deadline."""
+    _require_admin(x_admin_key)
+    return drain_controller.status()
+
+
 @app.get("/test-ws")
 async def websocket_test(websocket: WebSocket):
     """WebSocket test endpoint for connection validation."""
@@ -164,9 +262,21 @@ async def handle_incoming_call(request: Request):
             if validation_code:
                 logger.info("Event Grid subscription validation event received")
                 return {"validationResponse": validation_code}
-            
-            # Process incoming call event
-            await _process_incoming_call_event(event)
+        
+        # Answer every call in the batch concurrently; one failure must not delay the others.
+        # Failures are logged rather than returned to Event Grid: it would redeliver
+        # the whole batch, and answering an already answered call fails again
+        results = await asyncio.gather(
+            *(_process_incoming_call_event(event) for event in events),
+            return_exceptions=True
+        )
+        for event, result in zip(events, results):
+            if isinstance(result, Exception):
+                incoming_call_context = ACSHelper.get_incoming_call_context(
+                    ACSHelper.get_json_object(event.get('data', {}))
+                )
+                logger.error("Failed to answer incoming call (context: %s): %s", incoming_call_context, result,
+                             exc_info=result)
         
         return {"status": "success"}
         
@@ -207,6 +317,7 @@ async def handle_callback_events(
             event_type = event.get('type', '')
             if event_type:
                 logger.info("Processing event type: %s", event_type)
+            _track_call_event(context_id, event_type, event.get('data') or {})
         
         return {"status": "success"}
         
@@ -228,12 +339,18 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     
     media_handler = None
+    call = None
     
     try:
         logger.info("ACS WebSocket connection accepted")
         
-        # Create media streaming handler
-        media_handler = ACSMediaStreamingHandler(websocket)
+        # Create media streaming handler, attaching the call's pre-warmed Voice Live session
+        context_id = websocket.query_params.get("contextId")
+        media_handler = ACSMediaStreamingHandler(websocket, voice_live_pool.claim(context_id))
+        call = call_registry.attach_media(context_id, media_handler)
+        
+        # The call now counts as an active handler rather than a reservation
+        capacity_manager.release(context_id)
         
         # Process WebSocket messages
         await media_handler.process_websocket()
@@ -252,9 +369,16 @@ async def websocket_endpoint(websocket: WebSocket):
                 await media_handler.close()
             except (OSError, RuntimeError) as cleanup_error:
                 logger.error("Error during handler cleanup: %s", cleanup_error)
+        if call:
+            call_registry.remove(call.context_id)
         logger.info("WebSocket connection cleanup completed")
 
 
+ANSWER_CALL_SECONDS = Histogram(
+    "voice_bridge_answer_call_seconds", "Time for the Call Automation answer_call request"
+)
+
+
 async def _process_incoming_call_event(event: Dict[str, Any]) -> None:
     """
     Process incoming call event and initiate call automation.
@@ -276,11 +400,18 @@ async def _process_incoming_call_event(event: Dict[str, Any]) -> None:
         
         logger.info("Processing call from: %s", caller_id)
         
-        # Generate callback URL
+        # Refuse the call before doing any work for it if this instance is saturated
         context_id = str(uuid.uuid4())
+        admitted, reason = capacity_manager.try_admit(context_id)
+        if not admitted:
+            await _refuse_incoming_call(incoming_call_context, reason)
+            return
+        call = call_registry.create(context_id, caller_id)
+        
+        # Generate callback URL
         base_url = settings.base_url or f"https://{settings.host}:{settings.port}"
         callback_url = URLHelper.create_callback_url(base_url, context_id, caller_id)
-        websocket_url = URLHelper.create_websocket_url(base_url)
+        websocket_url = URLHelper.create_websocket_url(base_url, context_id)
         
         # Configure media streaming options
         media_streaming_options = MediaStreamingOptions(
@@ -290,15 +421,30 @@ async def _process_incoming_call_event(event: Dict[str, Any]) -> None:
             audio_channel_type=MediaStreamingAudioChannelType.MIXED,
             start_media_streaming=True,
             enable_bidirectional=True,
-            audio_format=AudioFormat.PCM16_K_MONO
+            audio_format=settings.acs_audio_format
         )
         
+        # Start the Voice Live handshake now so it overlaps answering the call
+        # and ACS setting up media streaming
+        if settings.voice_live_prewarm:
+            call.voice_live_service = voice_live_pool.prewarm(context_id)
+        
         # Answer the call immediately with a holding message while Voice Live connects
-        answer_result = call_automation_client.answer_call(
-            incoming_call_context=incoming_call_context,
-            callback_url=callback_url,
-            media_streaming=media_streaming_options
-        )
+        answer_start = time.perf_counter()
+        try:
+            answer_result = await call_automation_client.answer_call(
+                incoming_call_context=incoming_call_context,
+                callback_url=callback_url,
+                media_streaming=media_streaming_options
+            )
+        except Exception:
+            voice_live_pool.discard(context_id)
+            capacity_manager.release(context_id)
+            call_registry.remove(context_id)
+            raise
+        ANSWER_CALL_SECONDS.observe(time.perf_counter() - answer_start)
+        call.answered_at = time.monotonic()
+        call_registry.set_call_connection_id(context_id, answer_result.call_connection_id)
         logger.info("Call answered successfully - Connection ID: %s", answer_result.call_connection_id)
         logger.info("Call answered - Voice Live will connect shortly and begin AI conversation")
         
@@ -307,6 +453,71 @@ async def _process_incoming_call_event(event: Dict[str, Any]) -> None:
         logger.exception("Full exception details:")
 
 
+
+def _track_call_event(context_id: str, event_type: str, event_data: Dict[str, Any]) -> None:
+    """
+    Record a Call Automation callback event against its call in the registry.
+    
+    Args:
+        context_id: Context id from the callback URL
+        event_type: CloudEvent type, e.g. Microsoft.Communication.CallConnected
+        event_data: Event payload carrying the call connection id
+    """
+    call_connection_id = ACSHelper.get_call_connection_id(event_data)
+    call = call_registry.get(context_id) or call_registry.get_by_connection(call_connection_id)
+    if call is None:
+        return
+    
+    call.last_event_type = event_type
+    call_registry.set_call_connection_id(call.context_id, call_connection_id)
+    if event_type == "Microsoft.Communication.CallConnected":
+        call.connected_at = time.monotonic()
+        if call.state == "answering":
+            call.state = "connected"
+    elif event_type == "Microsoft.Communication.CallDisconnected":
+        # A streaming call is removed when its media WebSocket closes
+        if call.media_handler is None:
+            call_registry.remove(call.context_id)
+        else:
+            call.state = "disconnected"
+
+
+async def _hang_up_call(call_connection_id: str) -> None:
+    """Hang up a call for every participant (used when a drain reaches its deadline)."""
+    await call_automation_client.get_call_connection(call_connection_id).hang_up(is_for_everyone=True)
+
+
+def _overflow_target(raw_id: str) -> CommunicationIdentifier:
+    """Build the redirect target from a phone number or an ACS user id."""
+    if raw_id.startswith("+"):
+        return PhoneNumberIdentifier(raw_id)
+    return CommunicationUserIdentifier(raw_id)
+
+
+async def _refuse_incoming_call(incoming_call_context: str, reason: str) -> None:
+    """
+    Redirect or reject a call that admission control refused.
+    
+    Args:
+        incoming_call_context: Incoming call context from the Event Grid event
+        reason: Why the call was refused, for the log
+    """
+    if settings.overflow_redirect_target:
+        logger.warning("Redirecting call to %s: %s", settings.overflow_redirect_target, reason)
+        await call_automation_client.redirect_call(
+            incoming_call_context,
+            _overflow_target(settings.overflow_redirect_target)
+        )
+        REDIRECTED_CALLS.inc()
+    else:
+        logger.warning("Rejecting call as busy: %s", reason)
+        await call_automation_client.reject_call(
+            incoming_call_context,
+            call_reject_reason=CallRejectReason.BUSY
+        )
+        REJECTED_CALLS.inc()
+
+
 if __name__ == "__main__":
     logger.info("Starting Azure Communication Services Voice Live API service")
     
@@ -315,6 +526,7 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         log_level=settings.log_level.lower(),
+        log_config=None,  # Keep uvicorn logs on the queued root handler
         reload=False,  # Set to True for development
         access_log=True
     )
@@ -0,0 +1,165 @@
+"""
+Bounded media queues with explicit backpressure policies.
+Decouples receiving audio from sending it in each direction of the bridge.
+"""
+import asyncio
+import logging
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BackpressurePolicy(str, Enum):
+    """What a full media queue does with a new packet."""
+    DROP_OLDEST = "drop-oldest"  # Evict the oldest queued packet
+    DROP_SILENCE_FIRST = "drop-silence-first"  # Evict the oldest silent packet, else the oldest packet
+    BLOCK = "block"  # Make the producer wait for space
+
+
+class QueueStats:
+    """Per-queue counters, cheap enough to update on every packet."""
+    __slots__ = ("enqueued", "dequeued", "dropped", "dropped_silent", "max_depth", "blocked")
+    
+    def __init__(self):
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.dropped_silent = 0
+        self.max_depth = 0
+        self.blocked = 0
+    
+    def as_dict(self) -> Dict[str, int]:
+        """Return counters as a plain dictionary for logging and metrics."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class BoundedMediaQueue:
+    """
+    Bounded FIFO of audio packets for one direction of one call.
+    
+    Packets carry a silence flag so the drop-silence-first policy can shed
+    pauses before speech when the consumer falls behind.
+    """
+    
+    def __init__(self, name: str, maxsize: int, policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST):
+        """
+        Initialize bounded media queue.
+        
+        Args:
+            name: Queue name used in log messages (e.g. "upstream")
+            maxsize: Maximum number of queued packets
+            policy: Behaviour when a packet arrives at a full queue
+        """
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = BackpressurePolicy(policy)
+        self.stats = QueueStats()
+        self._items: Deque[Tuple[Any, bool]] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    @property
+    def depth(self) -> int:
+        """Number of packets currently queued."""
+        return len(self._items)
+    
+    async def put(self, item: Any, silent: bool = False) -> None:
+        """
+        Queue a packet, applying the backpressure policy when full.
+        
+        Args:
+            item: Packet to queue
+            silent: Whether the packet contains only silence
+        """
+        if len(self._items) >= self.maxsize:
+            if self.policy is BackpressurePolicy.BLOCK:
+                self.stats.blocked += 1
+                while len(self._items) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            else:
+                self._evict()
+        self._append(item, silent)
+    
+    def put_nowait(self, item: Any, silent: bool = False) -> None:
+        """
+        Queue a packet without waiting; a full queue always evicts.
+        
+        The block policy cannot wait here, so it falls back to dropping the
+        oldest packet.
+        
+        Args:
+            item: Packet to queue
+            silent: Whether the packet contains only silence
+        """
+        if len(self._items) >= self.maxsize:
+            self._evict()
+        self._append(item, silent)
+    
+    async def get(self) -> Any:
+        """Wait for and remove the oldest packet."""
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+    
+    def peek(self) -> Any:
+        """Return the oldest packet without removing it; raises IndexError when empty."""
+        return self._items[0][0]
+    
+    def get_nowait(self) -> Any:
+        """Remove the oldest packet; raises IndexError when empty."""
+        item, _ = self._items.popleft()
+        self.stats.dequeued += 1
+        self._not_full.set()
+        return item
+    
+    async def wait_not_empty(self) -> None:
+        """Wait until at least one packet is queued."""
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+    
+    def clear(self) -> int:
+        """
+        Discard every queued packet.
+        
+        Returns:
+            Number of packets discarded
+        """
+        discarded = len(self._items)
+        self._items.clear()
+        self._not_empty.clear()
+        self._not_full.set()
+        return discarded
+    
+    def _append(self, item: Any, silent: bool) -> None:
+        """Append a packet and update counters."""
+        self._items.append((item, silent))
+        self.stats.enqueued += 1
+        if len(self._items) > self.stats.max_depth:
+            self.stats.max_depth = len(self._items)
+        self._not_empty.set()
+    
+    def _evict(self) -> None:
+        """Drop one packet to make room, according to the policy."""
+        if self.policy is BackpressurePolicy.DROP_SILENCE_FIRST:
+            for index, (_, silent) in enumerate(self._items):
+                if silent:
+                    del self._items[index]
+                    self.stats.dropped += 1
+                    self.stats.dropped_silent += 1
+                    return
+        self._items.popleft()
+        self.stats.dropped += 1
+        
+        # Warn on the first drop and then every 100th to keep logs readable
+        if self.stats.dropped % 100 == 1:
+            logger.warning("%s queue full (%d packets) - %d packet(s) dropped so far",
+                           self.name, self.maxsize, self.stats.dropped)
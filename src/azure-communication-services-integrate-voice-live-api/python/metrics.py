@@ -0,0 +1,291 @@
+"""
+Lightweight in-process metrics for the voice bridge, exposed in OpenMetrics text format.
+Instruments are updated from the event loop thread only, so they need no locks.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Bucket upper bounds in seconds, tuned for conversational latency: fine
+# resolution below 100 ms for the local pipeline, coarse above one second
+# for model response time.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5,
+    0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0
+)
+
+# Bucket upper bounds in seconds for per-packet DSP and codec work
+DSP_BUCKETS = (
+    0.00002, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05
+)
+
+
+def _format_labels(labels: Dict[str, str], extra: str = "") -> str:
+    """Render a label set as ``{name="value",...}``, or an empty string."""
+    parts = [f'{name}="{value}"' for name, value in labels.items()]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing .0."""
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Ordered collection of instruments rendered together on a scrape."""
+    
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+    
+    def register(self, metric: "_Metric") -> None:
+        """Add an instrument; instruments sharing a name form one family."""
+        self._metrics.append(metric)
+    
+    def render(self) -> str:
+        """
+        Render every registered instrument in OpenMetrics text format.
+        
+        Returns:
+            Exposition text terminated by ``# EOF``
+        """
+        families: Dict[str, List[_Metric]] = {}
+        for metric in self._metrics:
+            families.setdefault(metric.name, []).append(metric)
+        
+        lines = []
+        for name, members in families.items():
+            lines.append(f"# TYPE {name} {members[0].type}")
+            lines.append(f"# HELP {name} {members[0].help}")
+            for metric in members:
+                metric.render(lines)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Metric:
+    """Common name, help text and label handling for all instruments."""
+    __slots__ = ("name", "help", "labels")
+    type = "unknown"
+    
+    def __init__(self, name: str, help: str, labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.help = help
+        self.labels = dict(labels or {})
+        REGISTRY.register(self)
+    
+    def render(self, lines: List[str]) -> None:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    
+    Either incremented in place or, with ``callback``, read from an existing
+    monotonic source (e.g. process CPU time) at scrape time.
+    """
+    __slots__ = ("value", "callback")
+    type = "counter"
+    
+    def __init__(self, name: str, help: str, labels: Optional[Dict[str, str]] = None,
+                 callback: Optional[Callable[[], float]] = None):
+        """
+        Initialize counter.
+        
+        Args:
+            name: Metric family name, without the ``_total`` suffix
+            help: One-line description of what is counted
+            labels: Constant labels for this member of the family
+            callback: Optional function returning the current total
+        """
+        super().__init__(name, help, labels)
+        self.value = 0
+        self.callback = callback
+    
+    def inc(self, amount: float = 1) -> None:
+        """Add ``amount`` to the counter."""
+        self.value += amount
+    
+    def get(self) -> float:
+        """Current total."""
+        return self.callback() if self.callback else self.value
+    
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"{self.name}_total{_format_labels(self.labels)} {_format_value(self.get())}")
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+    
+    Either set in place or, with ``callback``, computed at scrape time so the
+    hot path pays nothing (e.g. summing queue depths across active calls).
+    """
+    __slots__ = ("value", "callback")
+    type = "gauge"
+    
+    def __init__(self, name: str, help: str, labels: Optional[Dict[str, str]] = None,
+                 callback: Optional[Callable[[], float]] = None):
+        """
+        Initialize gauge.
+        
+        Args:
+            name: Metric name
+            help: One-line description of what is measured
+            labels: Constant labels for this member of the family
+            callback: Optional function returning the current value
+        """
+        super().__init__(name, help, labels)
+        self.value = 0
+        self.callback = callback
+    
+    def set(self, value: float) -> None:
+        """Set the gauge to ``value``."""
+        self.value = value
+    
+    def inc(self, amount: float = 1) -> None:
+        """Raise the gauge by ``amount``."""
+        self.value += amount
+    
+    def dec(self, amount: float = 1) -> None:
+        """Lower the gauge by ``amount``."""
+        self.value -= amount
+    
+    def get(self) -> float:
+        """Current value."""
+        return self.callback() if self.callback else self.value
+    
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"{self.name}{_format_labels(self.labels)} {_format_value(self.get())}")
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram of observed values.
+    
+    ``observe`` is a binary search and three integer/float updates, cheap
+    enough for per-packet use.
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+    type = "histogram"
+    
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labels: Optional[Dict[str, str]] = None):
+        """
+        Initialize histogram.
+        
+        Args:
+            name: Metric name
+            help: One-line description of what is measured
+            buckets: Bucket upper bounds; an implicit +Inf bucket is added
+            labels: Constant labels for this member of the family
+        """
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket that contains it.
+        
+        Args:
+            q: Quantile between 0.0 and 1.0
+        
+        Returns:
+            Bucket upper bound, or 0.0 with no observations; values in the
+            +Inf bucket report the largest finite bound
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+    
+    def summary(self) -> dict:
+        """Return count, mean and approximate p50/p90/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p90_ms": self.quantile(0.9) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000
+        }
+    
+    def render(self, lines: List[str]) -> None:
+        # Snapshot first so a scrape never reports a count below a bucket total
+        counts = list(self.counts)
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labels, 'le="%s"' % bound)
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        cumulative += counts[-1]
+        labels = _format_labels(self.labels, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {_format_value(self.sum)}")
+
+
+# Call and media counters updated on the hot path
+UPSTREAM_PACKETS = Counter("voice_bridge_audio_packets", "Audio packets handled by the bridge", {"direction": "upstream"})
+DOWNSTREAM_PACKETS = Counter("voice_bridge_audio_packets", "Audio packets handled by the bridge", {"direction": "downstream"})
+UPSTREAM_BYTES = Counter("voice_bridge_audio_bytes", "Decoded PCM bytes handled by the bridge", {"direction": "upstream"})
+DOWNSTREAM_BYTES = Counter("voice_bridge_audio_bytes", "Decoded PCM bytes handled by the bridge", {"direction": "downstream"})
+
+# Per-packet DSP and codec timings
+UPSTREAM_RESAMPLE_SECONDS = Histogram(
+    "voice_bridge_resample_seconds", "Time to resample one audio chunk", DSP_BUCKETS, {"direction": "upstream"}
+)
+DOWNSTREAM_RESAMPLE_SECONDS = Histogram(
+    "voice_bridge_resample_seconds", "Time to resample one audio chunk", DSP_BUCKETS, {"direction": "downstream"}
+)
+UPSTREAM_DECODE_SECONDS = Histogram(
+    "voice_bridge_decode_seconds", "Time to base64-decode one audio message", DSP_BUCKETS, {"direction": "upstream"}
+)
+DOWNSTREAM_DECODE_SECONDS = Histogram(
+    "voice_bridge_decode_seconds", "Time to base64-decode one audio message", DSP_BUCKETS, {"direction": "downstream"}
+)
+UPSTREAM_ENCODE_SECONDS = Histogram(
+    "voice_bridge_encode_seconds", "Time to encode one outgoing audio message", DSP_BUCKETS, {"direction": "upstream"}
+)
+DOWNSTREAM_ENCODE_SECONDS = Histogram(
+    "voice_bridge_encode_seconds", "Time to encode one outgoing audio message", DSP_BUCKETS, {"direction": "downstream"}
+)
+
+# Connection setup
+VOICE_LIVE_CONNECT_SECONDS = Histogram(
+    "voice_bridge_voice_live_connect_seconds", "Time to open the Voice Live WebSocket"
+)
+TOKEN_FETCH_SECONDS = Histogram(
+    "voice_bridge_token_fetch_seconds", "Time to fetch Azure access tokens on a cache miss"
+)
+
+# WebSocket failures by socket
+ACS_WEBSOCKET_ERRORS = Counter("voice_bridge_websocket_errors", "WebSocket errors by socket", {"socket": "acs"})
+VOICE_LIVE_WEBSOCKET_ERRORS = Counter("voice_bridge_websocket_errors", "WebSocket errors by socket", {"socket": "voice_live"})
+
+# Process CPU, read at scrape time
+PROCESS_CPU_SECONDS = Counter(
+    "process_cpu_seconds", "Total user and system CPU time spent by this process", callback=time.process_time
+)
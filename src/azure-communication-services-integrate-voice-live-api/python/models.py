@@ -6,8 +6,15 @@ from pydantic import BaseModel
 from typing import Optional, Dict, Any, Union, List
 import json
 import base64
+import binascii
+import logging
+import time
 from datetime import datetime
 
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
 
 class StreamingDataBase(BaseModel):
     """Base class for all streaming data types."""
@@ -56,11 +63,63 @@ class AudioData(StreamingDataBase):
             if not hasattr(self, '_decode_error_logged'):
                 import logging
                 logger = logging.getLogger(__name__)
-                logger.error(f"Base64 decode error: {e}, data sample: {self.data[:50]}...")
+                logger.error("Base64 decode error: %s, data sample: %s...", e, self.data[:50])
                 self._decode_error_logged = True
             return b""
 
 
+class AudioFrame:
+    """
+    Lightweight audio frame produced by ``StreamingDataParser.parse_fast``.
+    
+    Exposes the same accessors as ``AudioData`` without pydantic validation.
+    The base64 payload is only decoded when ``to_bytes`` is first called, so
+    frames ACS marks as silent are never decoded, and the timestamp is only
+    parsed when ``get_timestamp_ms`` is first called.
+    """
+    __slots__ = ("data", "timestamp", "participant_raw_id", "is_silent", "_audio", "_timestamp_ms")
+    
+    kind = "AudioData"
+    
+    def __init__(self, data: str, timestamp: Union[int, str], participant_raw_id: str, is_silent: bool):
+        self.data = data
+        self.timestamp = timestamp
+        self.participant_raw_id = participant_raw_id
+        self.is_silent = is_silent
+        self._audio: Optional[bytes] = None
+        self._timestamp_ms: Optional[int] = None
+    
+    def get_timestamp_ms(self) -> int:
+        """Get timestamp as milliseconds since epoch, parsed on first use."""
+        if self._timestamp_ms is None:
+            timestamp = self.timestamp
+            if isinstance(timestamp, int):
+                self._timestamp_ms = timestamp
+            else:
+                try:
+                    # Parse ISO 8601 format: '2025-07-23T10:35:30.363Z'
+                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                    self._timestamp_ms = int(dt.timestamp() * 1000)
+                except (TypeError, ValueError):
+                    self._timestamp_ms = 0
+        return self._timestamp_ms
+    
+    def to_bytes(self) -> bytes:
+        """Decode the base64 audio payload once and return the PCM bytes."""
+        if self._audio is None:
+            data = self.data
+            try:
+                # ACS payloads are normally padded; only copy when they are not
+                remainder = len(data) % 4
+                if remainder:
+                    data += '=' * (4 - remainder)
+                self._audio = binascii.a2b_base64(data)
+            except (binascii.Error, ValueError) as e:
+                logger.error("Base64 decode error: %s, data sample: %s...", e, self.data[:50])
+                self._audio = b""
+        return self._audio
+
+
 class AudioMetadata(StreamingDataBase):
     """Audio metadata from Azure Communication Services media streaming."""
     kind: str = "AudioMetadata"
@@ -77,6 +136,106 @@ class UnknownStreamingData(StreamingDataBase):
     properties: Dict[str, Any] = {}
 
 
+class _TimestampCache:
+    """
+    UTC ISO 8601 timestamps at millisecond granularity.
+    
+    The date/time prefix is formatted once per second and the formatted
+    string is reused for every packet within the same millisecond.
+    """
+    __slots__ = ("_second", "_prefix", "_millisecond", "_value")
+    
+    def __init__(self):
+        self._second = -1
+        self._prefix = ""
+        self._millisecond = -1
+        self._value = ""
+    
+    def now(self) -> str:
+        """Return the current UTC time formatted as '2025-07-23T10:35:30.363Z'."""
+        millisecond = time.time_ns() // 1_000_000
+        if millisecond != self._millisecond:
+            second, fraction = divmod(millisecond, 1000)
+            if second != self._second:
+                self._second = second
+                self._prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._millisecond = millisecond
+            self._value = f"{self._prefix}.{fraction:03d}Z"
+        return self._value
+
+
+_timestamps = _TimestampCache()
+
+
+class OutboundAudioEncoder:
+    """
+    Fast JSON encoder for outbound ACS audio and stop packets.
+    
+    Produces the same documents as building the nested dict and calling
+    ``json.dumps``, but from pre-built string templates, with a vectorized
+    all-zero check and cached timestamps, since it runs for every audio chunk
+    sent to the caller.
+    """
+    __slots__ = ("_suffix_silent", "_suffix_audible")
+    
+    _PREFIX = '{"kind":"AudioData","audioData":{"data":"'
+    _TIMESTAMP = '","timestamp":"'
+    _STOP_PREFIX = '{"kind":"StopAudio","stopAudio":{"timestamp":"'
+    _STOP_SUFFIX = '"}}'
+    
+    def __init__(self, participant_id: str = "VoiceLiveAI"):
+        """
+        Initialize outbound encoder.
+        
+        Args:
+            participant_id: Participant raw ID reported to ACS for outbound audio
+        """
+        participant = '","participantRawID":' + json.dumps(participant_id)
+        self._suffix_silent = participant + ',"silent":true}}'
+        self._suffix_audible = participant + ',"silent":false}}'
+    
+    @staticmethod
+    def is_all_zero(audio_bytes: Union[bytes, bytearray, memoryview]) -> bool:
+        """Check whether a PCM buffer is digital silence without a Python-level loop."""
+        if len(audio_bytes) == 0:
+            return True
+        return not np.frombuffer(audio_bytes, dtype=np.uint8).any()
+    
+    def encode(self, audio_bytes: Union[bytes, bytearray, memoryview]) -> str:
+        """
+        Encode raw PCM audio into an ACS AudioData message.
+        
+        Args:
+            audio_bytes: PCM audio data to send to ACS
+            
+        Returns:
+            JSON string in the format ACS expects
+        """
+        data = binascii.b2a_base64(audio_bytes, newline=False).decode("ascii")
+        return self.encode_base64(data, self.is_all_zero(audio_bytes))
+    
+    def encode_base64(self, data: str, silent: bool) -> str:
+        """
+        Encode already base64-encoded audio into an ACS AudioData message.
+        
+        Args:
+            data: Base64 encoded PCM audio data
+            silent: Whether the audio is silence
+            
+        Returns:
+            JSON string in the format ACS expects
+        """
+        suffix = self._suffix_silent if silent else self._suffix_audible
+        return self._PREFIX + data + self._TIMESTAMP + _timestamps.now() + suffix
+    
+    def encode_stop(self) -> str:
+        """Encode an ACS StopAudio message (barge-in scenarios)."""
+        return self._STOP_PREFIX + _timestamps.now() + self._STOP_SUFFIX
+
+
+_default_encoder = OutboundAudioEncoder()
+
+
 class OutboundAudioData(BaseModel):
     """Outbound audio data packet for ACS."""
     kind: str = "AudioData"
@@ -85,18 +244,9 @@ class OutboundAudioData(BaseModel):
     @classmethod
     def create(cls, audio_bytes: bytes, participant_id: str = "VoiceLiveAI") -> str:
         """Create JSON string for outbound audio data in the exact format ACS expects."""
-        timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-        
-        data = {
-            "kind": "AudioData",
-            "audioData": {
-                "data": base64.b64encode(audio_bytes).decode('utf-8'),
-                "timestamp": timestamp,
-                "participantRawID": participant_id,
-                "silent": len(audio_bytes) == 0 or all(b == 0 for b in audio_bytes)
-            }
-        }
-        return json.dumps(data)
+        if participant_id == "VoiceLiveAI":
+            return _default_encoder.encode(audio_bytes)
+        return OutboundAudioEncoder(participant_id).encode(audio_bytes)
 
 
 class StopAudioData(BaseModel):
@@ -105,20 +255,69 @@ class StopAudioData(BaseModel):
     @classmethod
     def create(cls) -> str:
         """Create JSON string to stop audio playback."""
-        timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-        
-        data = {
-            "kind": "StopAudio",
-            "stopAudio": {
-                "timestamp": timestamp
-            }
-        }
-        return json.dumps(data)
+        return _default_encoder.encode_stop()
 
 
 class StreamingDataParser:
     """Parser for incoming streaming data from ACS."""
     
+    @staticmethod
+    def sniff_kind(message: str) -> Optional[str]:
+        """
+        Read the "kind" value from a raw ACS message without parsing the JSON.
+        
+        ACS puts "kind" at the start of every message, so this only scans a
+        few dozen characters even for large audio frames.
+        
+        Args:
+            message: Raw JSON text from the ACS WebSocket
+            
+        Returns:
+            The kind string, or None if it cannot be located
+        """
+        key = message.find('"kind"')
+        if key < 0:
+            return None
+        start = message.find('"', key + 6)
+        end = message.find('"', start + 1)
+        if start < 0 or end < 0:
+            return None
+        return message[start + 1:end]
+    
+    @staticmethod
+    def parse_fast(message: str) -> Union[AudioFrame, AudioData, AudioMetadata, UnknownStreamingData]:
+        """
+        Parse a raw ACS message, taking a fast path for audio frames.
+        
+        AudioData messages, which arrive every 20 ms per call, become slotted
+        ``AudioFrame`` objects built straight from the decoded JSON. Metadata
+        and unknown messages fall back to the pydantic models in ``parse``.
+        
+        Args:
+            message: Raw JSON text from the ACS WebSocket
+            
+        Returns:
+            Parsed streaming data object
+        """
+        if StreamingDataParser.sniff_kind(message) != "AudioData":
+            return StreamingDataParser.parse(message)
+        
+        try:
+            data = json.loads(message)
+            audio_data = data.get("audioData", data)  # Fallback to direct structure
+            timestamp = audio_data.get("timestamp", 0)
+            if not isinstance(timestamp, (int, str)):
+                timestamp = int(timestamp) if timestamp else 0
+            return AudioFrame(
+                audio_data.get("data", ""),
+                timestamp,
+                audio_data.get("participantRawID", ""),
+                bool(audio_data.get("silent", False))  # Note: "silent" not "isSilent"
+            )
+        except (ValueError, TypeError, AttributeError):
+            # Malformed audio frame - let the full parser report it
+            return StreamingDataParser.parse(message)
+    
     @staticmethod
     def parse(json_data: Union[str, dict]) -> Union[AudioData, AudioMetadata, UnknownStreamingData]:
         """Parse JSON string or dict into appropriate streaming data object."""
@@ -172,7 +371,7 @@ class StreamingDataParser:
             
             # Handle timestamp parsing errors gracefully
             if "invalid literal for int()" in str(e) and "timestamp" in str(json_data):
-                logger.warning(f"Timestamp parsing error, using string format: {e}")
+                logger.warning("Timestamp parsing error, using string format: %s", e)
                 try:
                     if isinstance(json_data, dict):
                         audio_data = json_data.get("audioData", json_data)
@@ -185,10 +384,95 @@ class StreamingDataParser:
                 except Exception:
                     pass  # Fall through to generic error handling
             
-            logger.error(f"Error parsing streaming data: {e}")
+            logger.error("Error parsing streaming data: %s", e)
             return UnknownStreamingData(properties={"error": str(e), "received_data_type": str(type(json_data))})
 
 
+class VoiceLiveEventParser:
+    """
+    Field extraction for incoming Voice Live events without full JSON parsing.
+    
+    ``response.audio.delta`` events carry a large base64 payload; decoding
+    the whole document just to read its type and delta costs more than the
+    audio decode itself.
+    """
+    
+    @staticmethod
+    def sniff_type(message: str) -> str:
+        """
+        Read the top-level "type" value from a raw Voice Live event.
+        
+        Voice Live serializes "type" first, so this stops within a few dozen
+        characters. Falls back to a full parse if it cannot be located.
+        
+        Args:
+            message: Raw JSON text from the Voice Live WebSocket
+            
+        Returns:
+            The event type, or an empty string
+        """
+        event_type = VoiceLiveEventParser.extract_string(message, "type")
+        if event_type is not None:
+            return event_type
+        try:
+            return json.loads(message).get("type", "")
+        except (ValueError, AttributeError):
+            return ""
+    
+    @staticmethod
+    def extract_string(message: str, field: str) -> Optional[str]:
+        """
+        Slice the first string value stored under ``field`` out of raw JSON.
+        
+        Only valid for fields that appear once and before any nested object
+        using the same key, which holds for the Voice Live event fields read
+        here (type, delta, response_id).
+        
+        Args:
+            message: Raw JSON text
+            field: Key to look up
+            
+        Returns:
+            The string value, or None if the key is missing, the value is not
+            a string, or the value contains escapes and needs a real parse
+        """
+        key = message.find('"' + field + '"')
+        if key < 0:
+            return None
+        colon = message.find(':', key + len(field) + 2)
+        if colon < 0:
+            return None
+        start = colon + 1
+        while message[start:start + 1] in (' ', '\t', '\r', '\n'):
+            start += 1
+        if message[start:start + 1] != '"':
+            return None
+        end = message.find('"', start + 1)
+        if end < 0:
+            return None
+        value = message[start + 1:end]
+        if '\\' in value:
+            return None
+        return value
+    
+    @staticmethod
+    def extract_delta(message: str) -> str:
+        """
+        Get the base64 payload of a ``response.audio.delta`` event.
+        
+        Args:
+            message: Raw JSON text of the event
+            
+        Returns:
+            Base64 audio, or an empty string if the event has none
+        """
+        delta = VoiceLiveEventParser.extract_string(message, "delta")
+        if delta is None:
+            # Escaped or unusual formatting - parse properly
+            delta = json.loads(message).get("delta", "")
+        return delta
+
+
 class VoiceLiveMessage(BaseModel):
     """Azure OpenAI Voice Live API message structure."""
     type: str
@@ -201,7 +485,7 @@ class SessionUpdate(VoiceLiveMessage):
     session: Dict[str, Any]
     
     @classmethod
-    def create_default(cls) -> str:
+    def create_default(cls, input_sample_rate: int = 24000) -> str:
         """Create default session update configuration for agent mode."""
         session_config = {
             "type": "session.update",
@@ -213,7 +497,7 @@ class SessionUpdate(VoiceLiveMessage):
                     "silence_duration_ms": 500,  # Longer silence before ending turn
                     "remove_filler_words": False
                 },
-                "input_audio_sampling_rate": 24000,
+                "input_audio_sampling_rate": input_sample_rate,
                 "input_audio_noise_reduction": {"type": "azure_deep_noise_suppression"},
                 "input_audio_echo_cancellation": {"type": "server_echo_cancellation"},
                 "voice": {
@@ -239,6 +523,16 @@ class ResponseCreate(VoiceLiveMessage):
         return json.dumps({"type": "response.create"})
 
 
+class ResponseCancel(VoiceLiveMessage):
+    """Response cancellation message for Voice Live API (barge-in)."""
+    type: str = "response.cancel"
+    
+    @classmethod
+    def create(cls) -> str:
+        """Create response cancellation message."""
+        return json.dumps({"type": "response.cancel"})
+
+
 class InputAudioBuffer(VoiceLiveMessage):
     """Input audio buffer message for Voice Live API."""
     type: str = "input_audio_buffer.append"
@@ -251,3 +545,13 @@ class InputAudioBuffer(VoiceLiveMessage):
             "type": "input_audio_buffer.append",
             "audio": base64.b64encode(audio_bytes).decode('utf-8')
         })
+    
+    @staticmethod
+    def create_base64(audio_b64: str) -> str:
+        """
+        Create input audio buffer message from already base64-encoded audio.
+        
+        Base64 text never needs JSON escaping, so the payload is spliced in
+        as is rather than decoded and re-encoded.
+        """
+        return '{"type":"input_audio_buffer.append","audio":"' + audio_b64 + '"}'
@@ -0,0 +1,297 @@
+"""
+Outbound audio pacing for Azure Communication Services media streaming.
+Re-slices AI audio into fixed-size frames and sends them to ACS in real time.
+"""
+import asyncio
+import binascii
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, NamedTuple, Optional
+
+from helpers import AudioHelper
+from media_queue import BackpressurePolicy, BoundedMediaQueue, QueueStats
+from models import OutboundAudioEncoder
+from metrics import DOWNSTREAM_BYTES, DOWNSTREAM_ENCODE_SECONDS, DOWNSTREAM_PACKETS
+
+logger = logging.getLogger(__name__)
+
+
+class _Base64Frame(NamedTuple):
+    """A frame cut straight from base64 response audio, sent without decoding."""
+    data: str
+    silent: bool
+
+
+class OutboundAudioPacer:
+    """
+    Per-call outbound stage between Voice Live and the ACS WebSocket.
+    
+    Voice Live delivers response audio in bursts that are often several
+    hundred milliseconds long. Pushing those straight to ACS inflates the
+    ACS-side playout buffer, so a barge-in StopAudio has to chase audio that
+    is already queued remotely. The pacer instead keeps audio locally as
+    fixed 20 ms frames, releases them against a monotonic clock with a small
+    lead, and can drop everything still queued in one call to ``flush``.
+    """
+    
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        sample_rate: int = 16000,
+        channels: int = 1,
+        frame_ms: int = 20,
+        lead_ms: int = 60,
+        max_buffer_ms: int = 30000,
+        policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+        participant_id: str = "VoiceLiveAI",
+        on_frame_sent: Optional[Callable[[], None]] = None,
+        on_control_sent: Optional[Callable[[], None]] = None
+    ):
+        """
+        Initialize outbound audio pacer.
+        
+        Args:
+            send: Coroutine that sends a JSON message to ACS
+            sample_rate: ACS media streaming sample rate in Hz
+            channels: ACS media streaming channel count
+            frame_ms: Duration of each outbound frame in milliseconds
+            lead_ms: How far ahead of real time frames may be sent
+            max_buffer_ms: Maximum audio held locally before the backpressure policy applies
+            policy: Backpressure policy when the local buffer is full
+            participant_id: Participant raw ID reported to ACS
+            on_frame_sent: Optional callback run after each audio frame is sent
+            on_control_sent: Optional callback run after each control message is sent
+        """
+        self._send = send
+        self._on_frame_sent = on_frame_sent
+        self._on_control_sent = on_control_sent
+        self._encoder = OutboundAudioEncoder(participant_id)
+        self._frame_seconds = frame_ms / 1000.0
+        self._lead_seconds = lead_ms / 1000.0
+        self._frame_ms = frame_ms
+        
+        self._frames = BoundedMediaQueue("outbound", max_buffer_ms // frame_ms, policy)
+        self._control: Deque[str] = deque()
+        self._partial = bytearray()
+        self._next_send: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Future] = None
+        
+        self.frames_sent = 0
+        self.set_format(sample_rate, channels)
+    
+    def set_format(self, sample_rate: int, channels: int = 1) -> None:
+        """
+        Change the outbound frame size, discarding any partially filled frame.
+        
+        Args:
+            sample_rate: ACS media streaming sample rate in Hz
+            channels: ACS media streaming channel count
+        """
+        self.frame_bytes = sample_rate * channels * 2 * self._frame_ms // 1000
+        # Whole frames can be cut from base64 text only when a frame is a
+        # whole number of 3-byte base64 groups (960 bytes = 1280 chars at 24 kHz)
+        self._frame_chars = self.frame_bytes // 3 * 4 if self.frame_bytes % 3 == 0 else 0
+        self._partial.clear()
+    
+    @property
+    def depth(self) -> int:
+        """Number of complete frames waiting to be sent."""
+        return len(self._frames)
+    
+    @property
+    def stats(self) -> QueueStats:
+        """Queue counters for the outbound direction."""
+        return self._frames.stats
+    
+    def start(self) -> None:
+        """Start the pacing task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self) -> None:
+        """Stop the pacing task and drop any queued audio."""
+        self.flush()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def enqueue(self, audio: bytes) -> None:
+        """
+        Queue PCM audio for paced delivery.
+        
+        Audio is cut into whole frames; any remainder is held until the next
+        call or until ``finish`` pads it out at the end of a response. With
+        the block policy this waits while the local buffer is full.
+        
+        Args:
+            audio: PCM audio at the ACS sample rate
+        """
+        self._partial += audio
+        frame_bytes = self.frame_bytes
+        usable = len(self._partial) - len(self._partial) % frame_bytes
+        if not usable:
+            return
+        
+        view = memoryview(self._partial)
+        try:
+            frames = [bytes(view[start:start + frame_bytes]) for start in range(0, usable, frame_bytes)]
+        finally:
+            view.release()
+        del self._partial[:usable]
+        
+        for frame in frames:
+            await self._frames.put(frame, AudioHelper.is_silent_audio(frame))
+    
+    async def enqueue_base64(self, data: str) -> None:
+        """
+        Queue base64 PCM audio for paced delivery without decoding it.
+        
+        Whole frames are sliced from the base64 text and later sent with
+        ``OutboundAudioEncoder.encode_base64``. Audio that does not line up
+        with a frame boundary (topping up a held partial frame, or the tail
+        of the chunk) is decoded and handled as in ``enqueue``.
+        
+        Args:
+            data: Base64 PCM audio already at the ACS sample rate
+        """
+        frame_chars = self._frame_chars
+        if not frame_chars:
+            await self.enqueue(binascii.a2b_base64(data))
+            return
+        
+        start = 0
+        if self._partial:
+            # Fill the held partial frame first; give up on slicing if that
+            # would split a base64 group
+            needed = self.frame_bytes - len(self._partial)
+            start = min(needed // 3 * 4, len(data)) if needed % 3 == 0 else len(data)
+            await self.enqueue(binascii.a2b_base64(data[:start]))
+        
+        end = start + (len(data) - start) // frame_chars * frame_chars
+        for offset in range(start, end, frame_chars):
+            frame = data[offset:offset + frame_chars]
+            silent = not frame.strip("A")  # All-zero PCM encodes to all "A"
+            await self._frames.put(_Base64Frame(frame, silent), silent)
+        if end < len(data):
+            self._partial += binascii.a2b_base64(data[end:])
+    
+    async def finish(self) -> None:
+        """Pad and queue the trailing partial frame at the end of a response."""
+        if self._partial:
+            padding = self.frame_bytes - len(self._partial)
+            await self.enqueue(bytes(padding))
+    
+    def send_control(self, message: str) -> None:
+        """
+        Queue a pre-encoded control message (e.g. StopAudio) for ACS.
+        
+        Control messages are sent by the pacing task so it stays the only
+        writer of media to the ACS socket, but they are kept apart from the
+        audio frames: they go out ahead of any queued audio, never wait for
+        a frame slot, and are neither counted against the buffer nor
+        dropped by its backpressure policy or by ``flush``.
+        
+        Args:
+            message: JSON message to send to ACS
+        """
+        self._control.append(message)
+        self._wake()
+    
+    def flush(self) -> int:
+        """
+        Drop all queued and partial audio immediately (barge-in).
+        
+        Control messages already queued are kept.
+        
+        Returns:
+            Number of complete frames that were discarded
+        """
+        self._partial.clear()
+        self._next_send = None
+        self._wake()
+        return self._frames.clear()
+    
+    def _wake(self) -> None:
+        """Cut short whatever the pacing task is waiting for."""
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+    
+    async def _run(self) -> None:
+        """Release queued frames at real-time pace."""
+        try:
+            while True:
+                if self._control:
+                    await self._send(self._control.popleft())
+                    if self._on_control_sent:
+                        self._on_control_sent()
+                    continue
+                
+                if not self._frames:
+                    await self._wait_for_frames()
+                    continue
+                
+                now = time.monotonic()
+                # Restart the clock after an idle gap, a flush, or a stall,
+                # rather than bursting to catch up on missed frame slots
+                if self._next_send is None or self._next_send < now:
+                    self._next_send = now
+                
+                delay = self._next_send - self._lead_seconds - now
+                if delay > 0:
+                    await self._sleep(delay)
+                    continue  # Queue may have been flushed or a control message queued
+                
+                frame = self._frames.get_nowait()
+                self._next_send += self._frame_seconds
+                encode_start = time.perf_counter()
+                if isinstance(frame, _Base64Frame):
+                    message = self._encoder.encode_base64(frame.data, frame.silent)
+                    frame_bytes = len(frame.data) // 4 * 3
+                else:
+                    message = self._encoder.encode(frame)
+                    frame_bytes = len(frame)
+                DOWNSTREAM_ENCODE_SECONDS.observe(time.perf_counter() - encode_start)
+                await self._send(message)
+                self.frames_sent += 1
+                DOWNSTREAM_PACKETS.inc()
+                DOWNSTREAM_BYTES.inc(frame_bytes)
+                if self._on_frame_sent:
+                    self._on_frame_sent()
+        
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
+        except Exception as e:
+            logger.error("Error in outbound audio pacer: %s", e)
+    
+    async def _wait_for_frames(self) -> None:
+        """Wait until audio is queued, or until a control message is."""
+        self._wakeup = asyncio.get_running_loop().create_future()
+        frames = asyncio.ensure_future(self._frames.wait_not_empty())
+        try:
+            await asyncio.wait((self._wakeup, frames), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            frames.cancel()
+            self._wakeup = None
+    
+    async def _sleep(self, delay: float) -> None:
+        """Wait until the next frame slot, or until ``_wake`` cuts the wait short."""
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.create_future()
+        timer = loop.call_later(delay, _release, self._wakeup)
+        try:
+            await self._wakeup
+        finally:
+            timer.cancel()
+            self._wakeup = None
+
+
+def _release(waiter: asyncio.Future) -> None:
+    """Complete a pacer wait unless ``flush`` already did."""
+    if not waiter.done():
+        waiter.set_result(None)
@@ -84,6 +84,7 @@ def main():
             host=settings.host,
             port=settings.port,
             log_level=settings.log_level.lower(),
+            log_config=None,  # Keep uvicorn logs on the queued root handler
             access_log=True
         )
         
@@ -0,0 +1,180 @@
+"""
+Asynchronous Azure access token provider for the Voice Live connection.
+Fetches tokens off the event loop, coalesces concurrent refreshes and
+refreshes proactively before the cached tokens expire.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple
+
+from azure.identity import DefaultAzureCredential
+
+from metrics import TOKEN_FETCH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class AzureTokenProvider:
+    """
+    Process-wide cache of the Cognitive Services and Azure AI tokens.
+    
+    ``DefaultAzureCredential.get_token`` is a blocking HTTP call, so fetches
+    run in a worker thread. All concurrent callers share a single in-flight
+    refresh, and a background task refreshes ``refresh_margin_seconds``
+    before expiry so calls on the hot path normally find a valid token.
+    """
+    
+    def __init__(
+        self,
+        cognitive_services_scope: str,
+        azure_ai_scope: str,
+        safety_buffer_seconds: int = 5 * 60,
+        refresh_margin_seconds: int = 10 * 60,
+        retry_seconds: int = 30
+    ):
+        """
+        Initialize token provider.
+        
+        Args:
+            cognitive_services_scope: Scope for the Authorization header token
+            azure_ai_scope: Scope for the agent access token
+            safety_buffer_seconds: Cached tokens are not handed out this close to expiry
+            refresh_margin_seconds: Background refresh starts this long before expiry
+            retry_seconds: Delay before retrying a failed background refresh
+        """
+        self.cognitive_services_scope = cognitive_services_scope
+        self.azure_ai_scope = azure_ai_scope
+        self.safety_buffer_seconds = safety_buffer_seconds
+        self.refresh_margin_seconds = max(refresh_margin_seconds, safety_buffer_seconds)
+        self.retry_seconds = retry_seconds
+        
+        self._credential: Optional[DefaultAzureCredential] = None
+        self._tokens: Optional[Tuple[str, str]] = None
+        self._expires_on: Optional[float] = None  # Earliest expiry of the two tokens
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+    
+    @property
+    def expires_at(self) -> Optional[float]:
+        """Time after which cached tokens are no longer handed out."""
+        if self._expires_on is None:
+            return None
+        return self._expires_on - self.safety_buffer_seconds
+    
+    def cached_tokens(self) -> Optional[Tuple[str, str]]:
+        """Return the cached tokens if they are still valid, without fetching."""
+        if self._tokens and self._expires_on and time.time() < self.expires_at:
+            return self._tokens
+        return None
+    
+    def invalidate(self) -> None:
+        """Drop cached tokens, e.g. after the service rejected them with 401."""
+        self._tokens = None
+        self._expires_on = None
+    
+    async def get_tokens(self) -> Tuple[str, str]:
+        """
+        Get valid (cognitive services, azure ai) tokens without blocking the loop.
+        
+        Returns:
+            Tuple of cognitive services token and Azure AI token
+        """
+        tokens = self.cached_tokens()
+        if tokens:
+            return tokens
+        return await self.refresh()
+    
+    async def refresh(self) -> Tuple[str, str]:
+        """
+        Fetch fresh tokens, joining a refresh already in flight.
+        
+        Returns:
+            Tuple of cognitive services token and Azure AI token
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        # Shield so a cancelled caller does not cancel the fetch others are waiting on
+        return await asyncio.shield(self._refresh_task)
+    
+    async def force_refresh(self) -> Tuple[str, str]:
+        """Invalidate the cache and fetch fresh tokens (401 retry path)."""
+        logger.warning("Forcing token refresh due to authentication failure")
+        self.invalidate()
+        return await self.refresh()
+    
+    def get_tokens_blocking(self) -> Tuple[str, str]:
+        """
+        Get valid tokens, fetching on the calling thread if needed.
+        
+        Kept for synchronous callers outside the call path; it blocks the event
+        loop when called from it, so live calls should use ``get_tokens``.
+        """
+        tokens = self.cached_tokens()
+        if tokens:
+            return tokens
+        start = time.perf_counter()
+        result = self._fetch()
+        TOKEN_FETCH_SECONDS.observe(time.perf_counter() - start)
+        return self._store(result)
+    
+    async def start(self) -> None:
+        """Start background refresh and wait for the first tokens."""
+        if self._background_task is None:
+            self._background_task = asyncio.create_task(self._refresh_loop())
+        await self.get_tokens()
+    
+    async def stop(self) -> None:
+        """Stop background refresh."""
+        if self._background_task:
+            self._background_task.cancel()
+            try:
+                await self._background_task
+            except asyncio.CancelledError:
+                pass
+            self._background_task = None
+    
+    async def _refresh(self) -> Tuple[str, str]:
+        """Run one token fetch in a worker thread and store the result."""
+        logger.info("Fetching fresh Azure tokens")
+        start = time.perf_counter()
+        result = await asyncio.to_thread(self._fetch)
+        TOKEN_FETCH_SECONDS.observe(time.perf_counter() - start)
+        return self._store(result)
+    
+    def _fetch(self) -> Tuple[str, str, float]:
+        """Blocking fetch of both tokens; runs in a worker thread."""
+        if not self._credential:
+            self._credential = DefaultAzureCredential()
+        
+        # Get both tokens for agent authentication
+        cognitive_services_token = self._credential.get_token(self.cognitive_services_scope)
+        azure_ai_token = self._credential.get_token(self.azure_ai_scope)
+        expires_on = min(cognitive_services_token.expires_on, azure_ai_token.expires_on)
+        return cognitive_services_token.token, azure_ai_token.token, expires_on
+    
+    def _store(self, result: Tuple[str, str, float]) -> Tuple[str, str]:
+        """Cache fetched tokens; runs on the event loop thread."""
+        cognitive_services_token, azure_ai_token, expires_on = result
+        self._tokens = (cognitive_services_token, azure_ai_token)
+        self._expires_on = expires_on
+        logger.info("Tokens cached, expires at: %s", time.ctime(self.expires_at))
+        return self._tokens
+    
+    async def _refresh_loop(self) -> None:
+        """Refresh tokens ahead of expiry for as long as the service runs."""
+        try:
+            while True:
+                if self._expires_on is None:
+                    delay = 0.0
+                else:
+                    # Never spin on short-lived tokens: wait at least the retry delay
+                    delay = max(self._expires_on - self.refresh_margin_seconds - time.time(), self.retry_seconds)
+                await asyncio.sleep(delay)
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error("Background token refresh failed: %s", e)
+                    await asyncio.sleep(self.retry_seconds)
+        except asyncio.CancelledError:
+            pass  # Normal cancellation during shutdown
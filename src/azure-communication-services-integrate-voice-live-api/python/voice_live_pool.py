@@ -0,0 +1,138 @@
+"""
+Pre-warmed Voice Live sessions keyed by call context id.
+Starts the Voice Live handshake when a call is answered so the ACS media
+WebSocket can attach to a ready session instead of connecting on arrival.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from azure_voice_live_service import AzureVoiceLiveService
+from config import settings
+from metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceLiveSessionPool:
+    """
+    Voice Live sessions started ahead of their ACS media stream.
+    
+    ``prewarm`` opens a session for a context id as soon as the call is
+    answered; ``claim`` hands it to the media handler when ACS connects to
+    ``/ws`` with the same context id. Sessions that are never claimed (the
+    caller hung up, or media streaming failed to start) are closed after
+    ``ttl_seconds``.
+    """
+    
+    def __init__(self, ttl_seconds: float = 30.0):
+        """
+        Initialize session pool.
+        
+        Args:
+            ttl_seconds: How long an unclaimed session is kept open
+        """
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, AzureVoiceLiveService] = {}
+        self._expiry: Dict[str, asyncio.TimerHandle] = {}
+        self._closing: Set[asyncio.Task] = set()
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def prewarm(self, context_id: str) -> AzureVoiceLiveService:
+        """
+        Start connecting a Voice Live session for a call.
+        
+        Args:
+            context_id: Call context id, also carried on the media WebSocket URL
+        
+        Returns:
+            The session; its ``connect_task`` completes when the handshake does
+        """
+        existing = self._sessions.get(context_id)
+        if existing is not None:
+            return existing
+        
+        service = AzureVoiceLiveService()
+        service.connect_task = asyncio.create_task(service.connect())
+        self._sessions[context_id] = service
+        self._expiry[context_id] = asyncio.get_running_loop().call_later(
+            self.ttl_seconds, self._expire, context_id
+        )
+        logger.info("Pre-warming Voice Live session for context %s", context_id)
+        return service
+    
+    def claim(self, context_id: Optional[str]) -> Optional[AzureVoiceLiveService]:
+        """
+        Take the pre-warmed session for a call, if there is one.
+        
+        Args:
+            context_id: Call context id from the media WebSocket URL
+        
+        Returns:
+            The session (possibly still connecting), or None
+        """
+        if not context_id:
+            return None
+        service = self._sessions.pop(context_id, None)
+        timer = self._expiry.pop(context_id, None)
+        if timer is not None:
+            timer.cancel()
+        if service is not None:
+            logger.info("Claimed pre-warmed Voice Live session for context %s", context_id)
+        return service
+    
+    def discard(self, context_id: str) -> None:
+        """Close the pre-warmed session of a call that will never connect (e.g. answer failed)."""
+        timer = self._expiry.pop(context_id, None)
+        if timer is not None:
+            timer.cancel()
+        service = self._sessions.pop(context_id, None)
+        if service is not None:
+            self._close_later(service)
+    
+    def _expire(self, context_id: str) -> None:
+        """Close a session nobody claimed within the TTL."""
+        self._expiry.pop(context_id, None)
+        service = self._sessions.pop(context_id, None)
+        if service is not None:
+            logger.warning("Pre-warmed Voice Live session for context %s was never claimed - closing", context_id)
+            self._close_later(service)
+    
+    def _close_later(self, service: AzureVoiceLiveService) -> None:
+        """Close a session from synchronous code, keeping a reference to the task."""
+        task = asyncio.create_task(self._close(service))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    @staticmethod
+    async def _close(service: AzureVoiceLiveService) -> None:
+        """Cancel or finish the handshake, then close the session."""
+        if service.connect_task and not service.connect_task.done():
+            service.connect_task.cancel()
+            try:
+                await service.connect_task
+            except asyncio.CancelledError:
+                pass
+        await service.close()
+    
+    async def close_all(self) -> None:
+        """Close every unclaimed session (application shutdown)."""
+        for timer in self._expiry.values():
+            timer.cancel()
+        self._expiry.clear()
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(self._close(service) for service in sessions), return_exceptions=True)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+PREWARMED_SESSIONS = Gauge(
+    "voice_bridge_prewarmed_sessions", "Voice Live sessions waiting for their ACS media stream",
+    callback=lambda: len(voice_live_pool)
+)
+
+# Process-wide pool used by the Event Grid and media WebSocket endpoints
+voice_live_pool = VoiceLiveSessionPool(settings.voice_live_prewarm_ttl_seconds)